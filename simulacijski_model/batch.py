@@ -0,0 +1,169 @@
+import argparse
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from model.model import EvaluationModel
+from model.events import EventLog
+from cli import parse_speed, parse_fire
+
+PERCENTILES = (50, 90, 95, 100)
+
+
+# jedna simulacija bez vizualizacije, vraća sažetak
+def run_one(params):
+    started = time.perf_counter()
+
+    # bez događaja ako nije zadan direktorij, batch tada ne plaća ništa za logiranje
+    events_dir = params.get("events_dir")
+    if events_dir:
+        event_log = EventLog(path=os.path.join(events_dir, f"events_{params['run_id']}.jsonl"))
+    else:
+        event_log = EventLog(enabled=False)
+
+    model = EvaluationModel(
+        params["layout"],
+        seed=params["seed"],
+        smoke_spread_prob=params["smoke_spread_prob"],
+        speed_range=(params["min_speed"], params["max_speed"]),
+        fire_sources=params["fire_sources"],
+        event_log=event_log,
+        profile=params.get("profile", False),
+        record_every=params.get("record_every", 1),
+        synchronous=params.get("synchronous", False)
+    )
+
+    while model.running and model.steps < params["max_steps"]:
+        model.step()
+
+    event_log.close()
+
+    # vremenski nizovi po simulaciji idu u zaseban parquet, sažetak ostaje jedan redak
+    timeseries_dir = params.get("timeseries_dir")
+    if timeseries_dir:
+        model.recorder.to_parquet(os.path.join(timeseries_dir, f"timeseries_{params['run_id']}.parquet"))
+
+    summary = {
+        "run_id": params["run_id"],
+        "seed": params["seed"],
+        "smoke_spread_prob": params["smoke_spread_prob"],
+        "min_speed": params["min_speed"],
+        "max_speed": params["max_speed"],
+        "fire_sources": ";".join(f"{f},{x},{y}" for f, x, y in params["fire_sources"] or []),
+        "evacuated_count": model.evacuated_count,
+        "dead_count": model.dead_count,
+        "survival_rate": model.evacuated_count / model.population.size * 100 if model.population.size else 0.0,
+        "steps": model.steps,
+        "finished": not model.running,
+        "runtime_s": time.perf_counter() - started,
+    }
+
+    times = np.asarray(model.evacuation_times, dtype=float)
+    for p in PERCENTILES:
+        summary[f"evacuation_time_p{p}"] = float(np.percentile(times, p)) if times.size else np.nan
+
+    for exit_key, info in model.exit_info.items():
+        summary[f"exit_flow_{info['id']}"] = model.exit_flow_total[exit_key]
+
+    # ukupna vremena faza i broj poziva, samo uz --profile
+    if model.profiler is not None:
+        for entry in model.profiler.summary():
+            if entry["kind"] == "phase":
+                summary[f"phase_{entry['name']}_s"] = entry["seconds"]
+            else:
+                summary[f"calls_{entry['name']}"] = entry["calls"]
+
+    return summary
+
+
+# kartezijev produkt parametara, svaka kombinacija za svaki seed
+def build_runs(layout, seeds, smoke_probs, speed_ranges, fires, max_steps, events_dir=None, profile=False,
+               timeseries_dir=None, record_every=1, synchronous=False):
+    runs = []
+    combos = itertools.product(smoke_probs, speed_ranges, fires, seeds)
+
+    for run_id, (prob, (min_speed, max_speed), fire, seed) in enumerate(combos):
+        runs.append({
+            "run_id": run_id,
+            "layout": layout,
+            "seed": seed,
+            "smoke_spread_prob": prob,
+            "min_speed": min_speed,
+            "max_speed": max_speed,
+            "fire_sources": fire,
+            "max_steps": max_steps,
+            "events_dir": events_dir,
+            "profile": profile,
+            "timeseries_dir": timeseries_dir,
+            "record_every": record_every,
+            "synchronous": synchronous,
+        })
+
+    return runs
+
+
+def run_sweep(runs, workers=None):
+    workers = workers or os.cpu_count()
+
+    if workers == 1:
+        return pd.DataFrame([run_one(r) for r in runs])
+
+    # veći komadi smanjuju promet između procesa, manji bolje raspoređuju duge simulacije
+    chunksize = max(1, len(runs) // (workers * 4))
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(run_one, runs, chunksize=chunksize))
+
+    return pd.DataFrame(results)
+
+
+def write_results(df, path):
+    if path.endswith(".csv"):
+        df.to_csv(path, index=False)
+    else:
+        df.to_parquet(path, index=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Paralelni sweep parametara simulacije evakuacije")
+    parser.add_argument("--layout", default="podaci/building_layout.json")
+    parser.add_argument("--seeds", type=int, default=10, help="broj seedova po kombinaciji")
+    parser.add_argument("--seed-start", type=int, default=0)
+    parser.add_argument("--smoke-prob", type=float, nargs="+", default=[0.15])
+    parser.add_argument("--speed", type=parse_speed, nargs="+", default=[(0.5, 1.0)], help="min:max")
+    parser.add_argument("--fire", type=parse_fire, nargs="+", default=[None],
+                        help="'kat,x,y[;kat,x,y...]' ili 'layout'")
+    parser.add_argument("--max-steps", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--out", default="sweep_results.parquet", help=".parquet ili .csv")
+    parser.add_argument("--events-dir", default=None, help="direktorij za JSONL događaje po simulaciji")
+    parser.add_argument("--profile", action="store_true", help="dodaj trajanja faza koraka u rezultate")
+    parser.add_argument("--timeseries-dir", default=None, help="direktorij za parquet vremenske nizove po simulaciji")
+    parser.add_argument("--record-every", type=int, default=1, help="zapis vremenskih nizova svakih N koraka")
+    parser.add_argument("--synchronous", action="store_true", help="sinkroni pomak: odluke iz snimke, skupno rješavanje sukoba")
+    args = parser.parse_args(argv)
+
+    if args.events_dir:
+        os.makedirs(args.events_dir, exist_ok=True)
+    if args.timeseries_dir:
+        os.makedirs(args.timeseries_dir, exist_ok=True)
+
+    seeds = range(args.seed_start, args.seed_start + args.seeds)
+    runs = build_runs(
+        args.layout, seeds, args.smoke_prob, args.speed, args.fire, args.max_steps,
+        args.events_dir, args.profile, args.timeseries_dir, args.record_every, args.synchronous
+    )
+
+    started = time.perf_counter()
+    df = run_sweep(runs, args.workers)
+    write_results(df, args.out)
+
+    print(f"{len(df)} simulacija u {time.perf_counter() - started:.1f} s -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
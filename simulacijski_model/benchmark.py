@@ -0,0 +1,167 @@
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from model.model import EvaluationModel
+from model.events import EventLog
+from layout_generator import generate_layout, write_layout
+
+# scenariji za mjerenje: ime -> argumenti za EvaluationModel
+SCENARIOS = {
+    "building_layout": {
+        "layout_path": "podaci/building_layout.json",
+    },
+    "building_layout_multi_fire": {
+        "layout_path": "podaci/building_layout.json",
+        "smoke_spread_prob": 0.3,
+        "fire_sources": [(0, 4, 20), (0, 16, 20), (1, 9, 10)],
+    },
+    "generated_medium": {
+        "generate": {"width": 60, "height": 40, "floors": 3, "occupants": 300},
+    },
+    "generated_large": {
+        "generate": {"width": 120, "height": 80, "floors": 5, "occupants": 1500},
+    },
+    "generated_highrise": {
+        "generate": {"width": 200, "height": 200, "floors": 10, "occupants": 5000},
+    },
+}
+
+DEFAULT_SCENARIOS = ["building_layout", "building_layout_multi_fire", "generated_medium"]
+
+
+# generirani raspored se sprema u temp direktorij, ime ovisi o parametrima
+def scenario_kwargs(scenario):
+    kwargs = dict(SCENARIOS[scenario])
+    params = kwargs.pop("generate", None)
+
+    if params is not None:
+        digest = hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()[:10]
+        path = os.path.join(tempfile.gettempdir(), "vas_layouts", f"{scenario}_{digest}.json")
+
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            write_layout(generate_layout(**params), path)
+
+        kwargs["layout_path"] = path
+
+    return kwargs
+
+
+def build_model(scenario, seed):
+    return EvaluationModel(seed=seed, event_log=EventLog(enabled=False), **scenario_kwargs(scenario))
+
+
+def latency_stats(step_times):
+    if not step_times:
+        return {"steps": 0}
+
+    t = np.asarray(step_times) * 1000.0
+    total = float(np.sum(step_times))
+
+    return {
+        "steps": len(step_times),
+        "total_s": total,
+        "steps_per_s": len(step_times) / total if total > 0 else None,
+        "mean_ms": float(t.mean()),
+        "p50_ms": float(np.percentile(t, 50)),
+        "p90_ms": float(np.percentile(t, 90)),
+        "p99_ms": float(np.percentile(t, 99)),
+        "max_ms": float(t.max()),
+    }
+
+
+# korak po korak s mjerenjem trajanja svakog koraka
+def timed_steps(model, max_steps):
+    step_times = []
+    while model.running and len(step_times) < max_steps:
+        t0 = time.perf_counter()
+        model.step()
+        step_times.append(time.perf_counter() - t0)
+    return step_times
+
+
+# sažetak ishoda, mora biti isti za isti seed
+def fingerprint(model):
+    return {
+        "steps": model.steps,
+        "evacuated": model.evacuated_count,
+        "dead": model.dead_count,
+        "exit_flow_total": {info["id"]: model.exit_flow_total[k] for k, info in model.exit_info.items()},
+    }
+
+
+def bench_scenario(scenario, seed, first_n, max_steps, repeat):
+    construction = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        build_model(scenario, seed)
+        construction.append(time.perf_counter() - t0)
+
+    model = build_model(scenario, seed)
+    first = timed_steps(model, first_n)
+
+    model = build_model(scenario, seed)
+    full = timed_steps(model, max_steps)
+
+    return {
+        "scenario": scenario,
+        "seed": seed,
+        "construction_s": {
+            "min": min(construction),
+            "median": float(np.median(construction)),
+            "repeat": repeat,
+        },
+        "first_n": latency_stats(first),
+        "full_run": latency_stats(full),
+        "finished": not model.running,
+        "result": fingerprint(model),
+    }
+
+
+def check_determinism(scenario, seed, max_steps):
+    results = []
+    for _ in range(2):
+        model = build_model(scenario, seed)
+        timed_steps(model, max_steps)
+        results.append(fingerprint(model))
+    return results[0] == results[1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark koraka simulacije evakuacije")
+    parser.add_argument("--scenario", nargs="+", default=DEFAULT_SCENARIOS, choices=list(SCENARIOS))
+    parser.add_argument("--seed", type=int, nargs="+", default=[0])
+    parser.add_argument("--first-n", type=int, default=20)
+    parser.add_argument("--max-steps", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=3, help="ponavljanja mjerenja konstrukcije")
+    parser.add_argument("--check-determinism", action="store_true")
+    parser.add_argument("--out", default=None, help="JSON datoteka, inače stdout")
+    args = parser.parse_args(argv)
+
+    report = []
+    for scenario in args.scenario:
+        for seed in args.seed:
+            entry = bench_scenario(scenario, seed, args.first_n, args.max_steps, args.repeat)
+            if args.check_determinism:
+                entry["deterministic"] = check_determinism(scenario, seed, args.max_steps)
+            report.append(entry)
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.check_determinism and not all(e["deterministic"] for e in report):
+        raise SystemExit("rezultati nisu ponovljivi za isti seed")
+
+
+if __name__ == "__main__":
+    main()
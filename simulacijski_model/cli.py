@@ -0,0 +1,163 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+# moduli sučelja koje jezgra simulacije ne smije uvući
+UI_MODULES = ("solara", "matplotlib", "mesa.visualization", "vizualizacija")
+# gornja granica uvoza jezgre u sekundama (većinu troši sam mesa)
+IMPORT_BUDGET_S = 3.0
+# kao u batch.py: simulacija koja se ne zaustavi prekida se nakon ovoliko koraka
+MAX_STEPS = 5000
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def parse_speed(value):
+    lo, hi = value.split(":")
+    return float(lo), float(hi)
+
+
+def parse_fire(value):
+    if value == "layout":
+        return None
+    return [tuple(int(v) for v in src.split(",")) for src in value.split(";")]
+
+
+def summarize(model, runtime_s):
+    total = model.population.size
+    times = sorted(model.evacuation_times)
+
+    return {
+        "steps": model.steps,
+        "finished": not model.running,
+        "evacuated": model.evacuated_count,
+        "dead": model.dead_count,
+        "remaining": total - model.evacuated_count - model.dead_count,
+        "survival_rate": model.evacuated_count / total * 100 if total else 0.0,
+        "evacuation_time_median": times[len(times) // 2] if times else None,
+        "exit_flow_total": {info["id"]: model.exit_flow_total[key] for key, info in model.exit_info.items()},
+        "runtime_s": runtime_s,
+    }
+
+
+# simulacija bez sučelja: samo jezgra modela, uvoz tek kad se naredba izvršava
+def cmd_run(args):
+    from model.model import EvaluationModel
+    from model.events import EventLog
+
+    event_log = EventLog(path=args.events, echo=args.echo, enabled=bool(args.events or args.echo))
+
+    started = time.perf_counter()
+    if args.restore:
+        model = EvaluationModel.restore(args.restore, event_log=event_log)
+    else:
+        model = EvaluationModel(
+            args.layout,
+            seed=args.seed,
+            smoke_spread_prob=args.smoke_prob,
+            speed_range=args.speed,
+            fire_sources=args.fire,
+            event_log=event_log,
+            record_every=args.record_every,
+            synchronous=args.synchronous
+        )
+
+    while model.running and model.steps < args.max_steps:
+        model.step()
+
+    event_log.close()
+    summary = summarize(model, time.perf_counter() - started)
+
+    if args.checkpoint:
+        model.checkpoint(args.checkpoint)
+    if args.timeseries:
+        model.recorder.to_parquet(args.timeseries)
+
+    if model.running:
+        print(f"upozorenje: simulacija nije završila do granice od {args.max_steps} koraka", file=sys.stderr)
+
+    text = json.dumps(summary, indent=2, ensure_ascii=False)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+# sučelje se pokreće kao zaseban solara proces, tek tada se uvoze vizualizacijski moduli
+def cmd_serve(args):
+    command = [sys.executable, "-m", "solara", "run", os.path.join(HERE, "run.py")]
+    if args.port:
+        command += ["--port", str(args.port)]
+    raise SystemExit(subprocess.call(command, cwd=HERE))
+
+
+# uvoz jezgre u čistom procesu: trajanje i popis uvučenih modula sučelja
+def measure_import(module="model.model"):
+    code = (
+        "import sys, time, json\n"
+        f"sys.path.insert(0, {HERE!r})\n"
+        "t0 = time.perf_counter()\n"
+        f"import {module}\n"
+        "elapsed = time.perf_counter() - t0\n"
+        f"ui = [m for m in {UI_MODULES!r} if any(k == m or k.startswith(m + '.') for k in sys.modules)]\n"
+        "print(json.dumps({'seconds': elapsed, 'ui_modules': ui}))\n"
+    )
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, cwd=HERE)
+    return json.loads(out.stdout)
+
+
+def cmd_import_check(args):
+    result = measure_import()
+    print(f"uvoz jezgre: {result['seconds']:.2f} s (granica {args.budget:.2f} s)")
+
+    if result["ui_modules"]:
+        raise SystemExit(f"jezgra uvlači module sučelja: {', '.join(result['ui_modules'])}")
+    if result["seconds"] > args.budget:
+        raise SystemExit("uvoz jezgre je sporiji od zadane granice")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Simulacija evakuacije iz naredbenog retka")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="pokreni simulaciju bez sučelja")
+    run.add_argument("--layout", default="podaci/building_layout.json")
+    run.add_argument("--seed", type=int, default=None)
+    run.add_argument("--max-steps", "--steps", dest="max_steps", type=int, default=MAX_STEPS,
+                     help=f"najviše N koraka (zadano {MAX_STEPS}), nedovršeno se javlja upozorenjem")
+    run.add_argument("--smoke-prob", type=float, default=0.15)
+    run.add_argument("--speed", type=parse_speed, default=None, help="min:max")
+    run.add_argument("--fire", type=parse_fire, default=None, help="'kat,x,y[;kat,x,y...]' ili 'layout'")
+    run.add_argument("--synchronous", action="store_true")
+    run.add_argument("--record-every", type=int, default=1)
+    run.add_argument("--events", default=None, help="JSONL datoteka događaja")
+    run.add_argument("--echo", action="store_true", help="ispisuj događaje na konzolu")
+    run.add_argument("--out", default=None, help="sažetak u JSON datoteku, inače stdout")
+    run.add_argument("--timeseries", default=None, help="vremenski nizovi u parquet")
+    run.add_argument("--checkpoint", default=None, help="spremi završno stanje")
+    run.add_argument("--restore", default=None,
+                     help="nastavi iz checkpointa umjesto novog modela (pickle: samo checkpointi iz pouzdanog izvora)")
+    run.set_defaults(func=cmd_run)
+
+    serve = commands.add_parser("serve", help="pokreni Solara sučelje")
+    serve.add_argument("--port", type=int, default=None)
+    serve.set_defaults(func=cmd_serve)
+
+    check = commands.add_parser("import-check", help="izmjeri uvoz jezgre i provjeri da ne uvlači sučelje")
+    check.add_argument("--budget", type=float, default=IMPORT_BUDGET_S)
+    check.set_defaults(func=cmd_import_check)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
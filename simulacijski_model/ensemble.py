@@ -0,0 +1,190 @@
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import pandas as pd
+
+from batch import run_one, write_results, parse_speed, parse_fire
+
+# t kvantili za 95% dvostrani interval po stupnjevima slobode, iznad tablice normalna aproksimacija
+T95 = (
+    12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+    2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+    2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042,
+)
+Z95 = 1.960
+
+
+def t95(df):
+    return T95[df - 1] if df <= len(T95) else Z95
+
+
+class RunningStat:
+    """Welfordova sredina i varijanca, bez čuvanja svih vrijednosti"""
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, value):
+        self.n += 1
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (value - self.mean)
+
+    def half_width(self):
+        if self.n < 2:
+            return math.inf
+        return t95(self.n - 1) * math.sqrt(self.m2 / (self.n - 1) / self.n)
+
+    def summary(self):
+        hw = self.half_width()
+        return {
+            "n": self.n,
+            "mean": self.mean,
+            "ci_low": self.mean - hw,
+            "ci_high": self.mean + hw,
+            "half_width": hw,
+        }
+
+
+# metrike ansambla: stopa preživljavanja, broj koraka i protok po izlazu
+def metric_names(row):
+    return ["survival_rate", "steps"] + sorted(k for k in row if k.startswith("exit_flow_"))
+
+
+# interval je dovoljno uzak kad je polovica širine ispod apsolutne ili relativne granice
+def converged(stats, rel_tol, abs_tol):
+    return all(
+        stat.half_width() <= max(abs_tol, rel_tol * abs(stat.mean))
+        for stat in stats.values()
+    )
+
+
+# replike idu redom seedova: rezultat i točka zaustavljanja ne ovise o broju procesa;
+# replike prekinute na max_steps ostaju u tablici, ali ne ulaze u statistiku
+def run_ensemble(base, seed_start=0, min_runs=10, max_runs=1000, rel_tol=0.02, abs_tol=0.5,
+                 workers=None, progress=None):
+    workers = workers or os.cpu_count()
+    in_flight = max(1, workers * 2)
+
+    stats = {}
+    rows = []
+    complete = 0
+    done = {}
+    next_seed = seed_start
+    stopped = False
+
+    def params(seed):
+        return dict(base, seed=seed, run_id=seed - seed_start)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = {}
+
+        while True:
+            while not stopped and len(pending) < in_flight and next_seed < seed_start + max_runs:
+                pending[pool.submit(run_one, params(next_seed))] = next_seed
+                next_seed += 1
+
+            if not pending:
+                break
+
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                done[pending.pop(future)] = future.result()
+
+            # dodaj sve replike koje su na redu, pa provjeri konvergenciju nakon svake
+            while not stopped and seed_start + len(rows) in done:
+                row = done.pop(seed_start + len(rows))
+                rows.append(row)
+
+                if not stats:
+                    stats = {name: RunningStat() for name in metric_names(row)}
+                if row["finished"]:
+                    complete += 1
+                    for name, stat in stats.items():
+                        stat.add(float(row[name]))
+
+                if progress is not None:
+                    progress(len(rows), stats)
+
+                if complete >= min_runs and converged(stats, rel_tol, abs_tol):
+                    stopped = True
+
+            # nakon zaustavljanja se ne čekaju replike koje još nisu krenule
+            if stopped:
+                for future in pending:
+                    future.cancel()
+                break
+
+    summary = {name: stat.summary() for name, stat in stats.items()}
+    return pd.DataFrame(rows), summary, stopped
+
+
+def unfinished_count(df):
+    return int((~df["finished"].astype(bool)).sum()) if len(df) else 0
+
+
+def print_summary(summary, runs, stopped, elapsed, unfinished=0):
+    status = "konvergiralo" if stopped else "dosegnut maksimalan broj replika"
+    print(f"{runs} replika u {elapsed:.1f} s ({status})")
+    if unfinished:
+        print(f"{unfinished} replika prekinuto na --max-steps, izostavljene iz statistike")
+    print(f"{'metrika':<40} {'sredina':>10} {'95% CI':>24} {'±':>8}")
+    for name, s in summary.items():
+        ci = f"[{s['ci_low']:.2f}, {s['ci_high']:.2f}]"
+        print(f"{name:<40} {s['mean']:>10.2f} {ci:>24} {s['half_width']:>8.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Monte Carlo ansambl jednog scenarija s ranim zaustavljanjem")
+    parser.add_argument("--layout", default="podaci/building_layout.json")
+    parser.add_argument("--seed-start", type=int, default=0)
+    parser.add_argument("--smoke-prob", type=float, default=0.15)
+    parser.add_argument("--speed", type=parse_speed, default=(0.5, 1.0), help="min:max")
+    parser.add_argument("--fire", type=parse_fire, default=None, help="'kat,x,y[;kat,x,y...]' ili 'layout'")
+    parser.add_argument("--max-steps", type=int, default=5000)
+    parser.add_argument("--synchronous", action="store_true")
+    parser.add_argument("--min-runs", type=int, default=10)
+    parser.add_argument("--max-runs", type=int, default=1000)
+    parser.add_argument("--rel-tol", type=float, default=0.02, help="dopuštena polovica CI relativno na sredinu")
+    parser.add_argument("--abs-tol", type=float, default=0.5, help="dopuštena apsolutna polovica CI")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--out", default=None, help="replike u .parquet ili .csv")
+    parser.add_argument("--summary-out", default=None, help="sažetak s intervalima u JSON")
+    args = parser.parse_args(argv)
+
+    base = {
+        "layout": args.layout,
+        "smoke_spread_prob": args.smoke_prob,
+        "min_speed": args.speed[0],
+        "max_speed": args.speed[1],
+        "fire_sources": args.fire,
+        "max_steps": args.max_steps,
+        "synchronous": args.synchronous,
+    }
+
+    started = time.perf_counter()
+    df, summary, stopped = run_ensemble(
+        base, args.seed_start, args.min_runs, args.max_runs, args.rel_tol, args.abs_tol, args.workers
+    )
+    unfinished = unfinished_count(df)
+    print_summary(summary, len(df), stopped, time.perf_counter() - started, unfinished)
+    if unfinished:
+        print(f"upozorenje: {unfinished} od {len(df)} replika nije završilo do {args.max_steps} koraka",
+              file=sys.stderr)
+
+    if args.out:
+        write_results(df, args.out)
+    if args.summary_out:
+        with open(args.summary_out, "w") as f:
+            json.dump({"runs": len(df), "unfinished": unfinished, "converged": stopped, "metrics": summary}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+import argparse
+import json
+import random
+
+
+# sobe uz hodnike, hodnici spojeni okomitim "kralježnicama" na kojima su stepenice
+def generate_layout(
+    width=60,
+    height=40,
+    floors=2,
+    room_density=0.8,
+    occupants=100,
+    seed=0,
+    room_depth=7,
+    room_width=(6, 10),
+    corridor_width=3,
+    spine_spacing=30,
+    exit_capacity=(2, 4),
+    emergency_exits=True,
+    fires=1,
+    alarm_spacing=26,
+    vent_spacing=20
+):
+    rng = random.Random(seed)
+    half = corridor_width // 2
+    module = 2 * room_depth + corridor_width
+
+    if height - 2 < module or width < 2 * corridor_width + room_width[0]:
+        raise ValueError(f"premali kat {width}x{height} za sobe dubine {room_depth}")
+
+    # okomiti hodnici (kralježnice)
+    spines = list(range(1 + half, width - 1 - half, spine_spacing))
+
+    # vodoravni hodnici, jedan po modulu soba-hodnik-soba
+    modules = (height - 2) // module
+    corridor_rows = [1 + k * module + room_depth + half for k in range(modules)]
+
+    # dvije pozicije okna stepenica po kralježnici, katovi ih naizmjence koriste
+    stair_rows = (height // 3, 2 * height // 3)
+
+    layout_floors = []
+    all_rooms = []
+
+    for fid in range(floors):
+        corridors = []
+
+        for i, yc in enumerate(corridor_rows):
+            corridors.append({
+                "id": f"hodnik_{fid}_{i}",
+                "path": [{"x": x, "y": yc} for x in range(1 + half, width - 1 - half)],
+                "width": corridor_width
+            })
+
+        for i, xs in enumerate(spines):
+            corridors.append({
+                "id": f"kraljeznica_{fid}_{i}",
+                "path": [{"x": xs, "y": y} for y in range(1 + half, height - 1 - half)],
+                "width": corridor_width
+            })
+
+        # sobe s obje strane svakog hodnika, između kralježnica
+        rooms = []
+        for k, yc in enumerate(corridor_rows):
+            bands = (
+                (yc - half - room_depth, "down"),
+                (yc + half + 1, "up"),
+            )
+
+            for y0, door_side in bands:
+                segment_starts = [1] + [xs + half + 1 for xs in spines]
+                segment_ends = [xs - half for xs in spines] + [width - 1]
+
+                for sx0, sx1 in zip(segment_starts, segment_ends):
+                    x = sx0
+                    while sx1 - x >= room_width[0]:
+                        rw = rng.randint(room_width[0], room_width[1])
+                        if sx1 - x - rw < room_width[0]:
+                            rw = sx1 - x
+
+                        if rng.random() < room_density:
+                            door_x = x + rw // 2
+                            door_y = y0 + room_depth - 1 if door_side == "down" else y0
+
+                            rooms.append({
+                                "id": f"soba_{fid}_{len(rooms)}",
+                                "type": "office",
+                                "bounds": {"x": x, "y": y0, "width": rw, "height": room_depth},
+                                "max_occupancy": 0,
+                                "doors": [{"x": door_x, "y": door_y}]
+                            })
+
+                        x += rw
+
+        all_rooms.extend((fid, r) for r in rooms)
+
+        # izlazi: krajevi hodnika u prizemlju, jedan izlaz u slučaju opasnosti na višim katovima
+        exits = []
+        if fid == 0:
+            ends = []
+            for yc in corridor_rows:
+                ends += [(0, yc), (width - 1, yc)]
+            for xs in spines:
+                ends += [(xs, 0), (xs, height - 1)]
+
+            for i, (ex, ey) in enumerate(ends):
+                exits.append({
+                    "id": f"izlaz_{i}",
+                    "position": {"x": ex, "y": ey},
+                    "width": corridor_width,
+                    "capacity": rng.randint(exit_capacity[0], exit_capacity[1])
+                })
+        elif emergency_exits:
+            exits.append({
+                "id": f"izlaz_u_slucaju_opasnosti_{fid}",
+                "position": {"x": 0, "y": corridor_rows[0]},
+                "width": 2,
+                "capacity": exit_capacity[0]
+            })
+
+        stairs = []
+        for i, xs in enumerate(spines):
+            if fid > 0:
+                sy = stair_rows[(fid - 1) % 2]
+                stairs.append({
+                    "id": f"stepenice_{i}_dolje",
+                    "position": {"x": xs, "y": sy},
+                    "width": 2,
+                    "connects_to_floor": fid - 1
+                })
+            if fid < floors - 1:
+                sy = stair_rows[fid % 2]
+                stairs.append({
+                    "id": f"stepenice_{i}_gore",
+                    "position": {"x": xs, "y": sy},
+                    "width": 2,
+                    "connects_to_floor": fid + 1
+                })
+
+        layout_floors.append({
+            "floor_id": fid,
+            "name": "prizemlje" if fid == 0 else f"{fid}. kat",
+            "dimensions": {"width": width, "height": height},
+            "exits": exits,
+            "stairs": stairs,
+            "rooms": rooms,
+            "corridors": corridors
+        })
+
+    # ljudi po sobama razmjerno unutrašnjoj površini, hodnici dobiju još 25% (kao u modelu)
+    room_people = round(occupants / 1.25)
+    areas = [(r["bounds"]["width"] - 2) * (r["bounds"]["height"] - 2) for _, r in all_rooms]
+    total_area = sum(areas)
+
+    if total_area:
+        shares = [room_people * a / total_area for a in areas]
+        counts = [min(int(s), a) for s, a in zip(shares, areas)]
+        order = sorted(range(len(areas)), key=lambda i: shares[i] - int(shares[i]), reverse=True)
+
+        for i in order:
+            if sum(counts) >= room_people:
+                break
+            if counts[i] < areas[i]:
+                counts[i] += 1
+
+        for (_, room), count in zip(all_rooms, counts):
+            room["max_occupancy"] = count
+
+    alarms = []
+    ventilation = []
+    for fid in range(floors):
+        for yc in corridor_rows:
+            for x in range(1 + alarm_spacing // 2, width - 1, alarm_spacing):
+                alarms.append({"floor": fid, "x": x, "y": yc})
+            for x in range(1 + vent_spacing // 2, width - 1, vent_spacing):
+                ventilation.append({"floor": fid, "x": x, "y": yc})
+
+    fire_sources = []
+    for i in range(fires):
+        if not all_rooms:
+            break
+        fid, room = rng.choice(all_rooms)
+        b = room["bounds"]
+        fire_sources.append({
+            "id": f"pozar{i + 1}",
+            "floor": fid,
+            "position": {
+                "x": rng.randint(b["x"] + 1, b["x"] + b["width"] - 2),
+                "y": rng.randint(b["y"] + 1, b["y"] + b["height"] - 2)
+            },
+            "growth_rate": 0.2,
+            "smoke_rate": 0.2
+        })
+
+    return {
+        "building": {
+            "id": f"generirana_{width}x{height}x{floors}_{seed}",
+            "floors": floors,
+            "cell_size_meters": 1.0
+        },
+        "people": {
+            "speed": {"min": 0.5, "max": 1.0}
+        },
+        "floors": layout_floors,
+        "hazards": {
+            "fire_sources": fire_sources,
+            "random_fire_sources": {
+                "enabled": True,
+                "count": 1,
+                "allowed_floors": list(range(floors)),
+                "growth_rate_range": [0.1, 0.4],
+                "smoke_rate_range": [0.1, 0.3]
+            }
+        },
+        "alarms": alarms,
+        "ventilation": ventilation
+    }
+
+
+def write_layout(layout, path):
+    with open(path, "w") as f:
+        json.dump(layout, f, indent=2, ensure_ascii=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generator rasporeda zgrade u formatu building_layout.json")
+    parser.add_argument("out")
+    parser.add_argument("--width", type=int, default=60)
+    parser.add_argument("--height", type=int, default=40)
+    parser.add_argument("--floors", type=int, default=2)
+    parser.add_argument("--room-density", type=float, default=0.8)
+    parser.add_argument("--occupants", type=int, default=100)
+    parser.add_argument("--fires", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    layout = generate_layout(
+        width=args.width,
+        height=args.height,
+        floors=args.floors,
+        room_density=args.room_density,
+        occupants=args.occupants,
+        fires=args.fires,
+        seed=args.seed
+    )
+    write_layout(layout, args.out)
+
+    rooms = sum(len(f["rooms"]) for f in layout["floors"])
+    print(f"{args.out}: {args.floors} katova, {rooms} soba, ~{args.occupants} ljudi")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,10 @@
 import mesa
-import random
+import numpy as np
+
+try:
+    from model.population import column_property, STRATEGIES, STRATEGY_CODES, DEAD, EVACUATED
+except ImportError:
+    from population import column_property, STRATEGIES, STRATEGY_CODES, DEAD, EVACUATED
 
 SMOKE_TOLERANCE_STEPS = 3.0
 SMOKE_DEATH_THRESHOLD = 7.0
@@ -7,31 +12,6 @@ HEAT_DAMAGE_THRESHOLD = 4.0
 HEAT_DEATH_THRESHOLD = 8.0
 
 
-class ExitAgent(mesa.Agent):
-    def __init__(self, unique_id, model):
-        super().__init__(model)
-        self.unique_id = unique_id
-
-class WallAgent(mesa.Agent):
-    def __init__(self, unique_id, model):
-        super().__init__(model)
-        self.unique_id = unique_id
-
-class StairAgent(mesa.Agent):
-    def __init__(self, unique_id, model):
-        super().__init__(model)
-        self.unique_id = unique_id
-
-class SmokeAgent(mesa.Agent):
-    def __init__(self, unique_id, model):
-        super().__init__(model)
-        self.unique_id = unique_id
-
-class VentilationAgent(mesa.Agent):
-    def __init__(self, unique_id, model):
-        super().__init__(model)
-        self.unique_id = unique_id
-
 class AlarmAgent(mesa.Agent):
     def __init__(self, unique_id, model, floor, position, radius=6):
         super().__init__(model)
@@ -46,18 +26,28 @@ class AlarmAgent(mesa.Agent):
         self.DETECTION_DELAY = 3
         self.ACTIVATION_DELAY = 5
 
+        # pokrivenost alarma (Moore susjedstvo radijusa radius) je pravokutnik kata
+        grid = model.grids[floor]
+        px, py = position
+        self.window = (
+            max(0, px - radius), min(grid.width, px + radius + 1),
+            max(0, py - radius), min(grid.height, py + radius + 1)
+        )
+
+    # koje od zadanih ćelija kata alarm pokriva
+    def covers(self, xs, ys):
+        x0, x1, y0, y1 = self.window
+        return (xs >= x0) & (xs < x1) & (ys >= y0) & (ys < y1)
+
     @property
     def active(self):
         return self.state == "active"
 
     def step(self):
-        grid = self.model.grids[self.floor]
-
-        smoke_nearby = False
-        for pos in grid.get_neighborhood(self.position, moore=True, radius=self.radius):
-            if any(isinstance(a, SmokeAgent) for a in grid.get_cell_list_contents(pos)):
-                smoke_nearby = True
-                break
+        # dim bilo gdje u pokrivenosti osim na samom alarmu
+        x0, x1, y0, y1 = self.window
+        smoke = self.model.grids[self.floor].smoke
+        smoke_nearby = np.count_nonzero(smoke[x0:x1, y0:y1]) > (smoke[self.position] > 0)
 
         if self.state == "idle":
             if smoke_nearby:
@@ -78,51 +68,118 @@ class AlarmAgent(mesa.Agent):
             self.detect_timer += 1
             if self.detect_timer >= self.ACTIVATION_DELAY:
                 self.state = "active"
+                self.model.log_event(
+                    "alarm_activated",
+                    alarm=self.unique_id,
+                    floor=self.floor,
+                    x=self.position[0],
+                    y=self.position[1]
+                )
 
 
 
 class EvacueeAgent(mesa.Agent):
+    # stanje je u model.population, agent je pogled na svoj redak
+    floor = column_property("floor", int)
+    speed = column_property("speed", float)
+    panic = column_property("panic", float)
+    smoke_steps = column_property("smoke_steps", float)
+    stuck_steps = column_property("stuck_steps", int)
+    alarm_heard = column_property("alarm_heard", bool)
+
     def __init__(self, unique_id, model):
+        # redak se zauzima prije mesa.Agent.__init__ jer on postavlja pos
+        self._population = model.population
+        self.idx = self._population.add(self)
+
         super().__init__(model)
         self.unique_id = unique_id
-        self.speed = random.uniform(
+        self.speed = self.model.random.uniform(
             self.model.min_speed,
             self.model.max_speed
         )
 
         # statusi
-        self.dead = False
-        self.evacuated = False
-        self.panic = random.uniform(0.0, 0.3) # početna panika
-
-        self.smoke_steps = 0
+        self.panic = self.model.random.uniform(0.0, 0.3) # početna panika
 
         self.spawn_step = model.steps
         self.evacuated_step = None
         self.evacuation_time = None
 
-        self.last_exit_dist = None
-        self.stuck_steps = 0
-
-        self.visible_cells = set()
+        self.visible_window = None
         self.vision_range = 5
         self.blocked_cells = set()
 
-        self.alarm_heard = False
-
-        self.strategy = random.choice([
+        self.strategy = self.model.random.choice([
             "shortest",
             "safest",
             "least_crowded"
         ])
 
-    def die(self):
+    @property
+    def pos(self):
+        return self._pos
+
+    # grid postavlja pos, položaj se prepisuje u stupce populacije
+    @pos.setter
+    def pos(self, value):
+        self._pos = value
+        pop = self._population
+        if value is None:
+            pop.placed[self.idx] = False
+        else:
+            pop.placed[self.idx] = True
+            pop.x[self.idx], pop.y[self.idx] = value
+
+    @property
+    def dead(self):
+        return self._population.status[self.idx] == DEAD
+
+    @property
+    def evacuated(self):
+        return self._population.status[self.idx] == EVACUATED
+
+    @property
+    def strategy(self):
+        return STRATEGIES[self._population.strategy[self.idx]]
+
+    @strategy.setter
+    def strategy(self, value):
+        self._population.strategy[self.idx] = STRATEGY_CODES[value]
+
+    @property
+    def last_exit_dist(self):
+        dist = self._population.last_exit_dist[self.idx]
+        return None if np.isnan(dist) else int(dist)
+
+    # ćelije u vidnom polju, računaju se iz okvira tek kad zatrebaju
+    @property
+    def visible_cells(self):
+        if self.visible_window is None:
+            return set()
+
+        floor, x0, x1, y0, y1 = self.visible_window
+        return {
+            (floor, x, y)
+            for x in range(x0, x1)
+            for y in range(y0, y1)
+        }
+
+    def die(self, cause="smoke", **details):
         if self.dead:
             return
 
-        self.dead = True
+        self._population.status[self.idx] = DEAD
         self.model.dead_count += 1
-        print(f"Agent {self.unique_id} je poginuo u dimu")
+        self.model.log_event(
+            "died",
+            agent=self.unique_id,
+            cause=cause,
+            floor=self.floor,
+            x=self.pos[0],
+            y=self.pos[1],
+            **details
+        )
 
         self.model.grids[self.floor].remove_agent(self)
 
@@ -130,7 +187,7 @@ class EvacueeAgent(mesa.Agent):
         if self.evacuated or self.dead:
             return
 
-        self.evacuated = True
+        self._population.status[self.idx] = EVACUATED
         self.evacuated_step = self.model.steps
         self.evacuation_time = self.evacuated_step - self.spawn_step
 
@@ -140,44 +197,16 @@ class EvacueeAgent(mesa.Agent):
         exit_key = (self.floor, self.pos[0], self.pos[1])
         exit_info = self.model.exit_info.get(exit_key)
         exit_id = exit_info["id"] if exit_info else "Unknown"
-        print(
-            f"EVAKUIRAN agent {self.unique_id} | izlaz: {exit_id} | vrijeme evakuacije: {self.evacuation_time} | ukupno evakuiranih: {self.model.evacuated_count}"
+        self.model.log_event(
+            "evacuated",
+            agent=self.unique_id,
+            exit=exit_id,
+            evacuation_time=self.evacuation_time,
+            total_evacuated=self.model.evacuated_count
         )
 
         self.model.grids[self.floor].remove_agent(self)
 
-    def panic_update(self):
-        self.panic = min(1.0, self.panic + 0.02)
-
-        grid = self.model.grids[self.floor]
-
-        neighboors = grid.get_neighborhood(self.pos, moore=True, include_center=False)
-        if any(
-            any(isinstance(a, SmokeAgent)for a in grid.get_cell_list_contents(n))
-                for n in neighboors
-        ):
-            self.panic = min(1.0, self.panic + 0.05)
-
-    def adapt_strategy(self):
-        if self.stuck_steps >= 5:
-            self.strategy = "least_crowded"
-            self.panic = min(1.0, self.panic + 0.15)
-            return
-
-        if self.panic > 0.7:
-            self.strategy = "shortest"
-            return
-
-        if self.panic > 0.5:
-            self.strategy = "least_crowded"
-            return
-
-        if self.panic >= 0.2:
-            self.strategy = "safest"
-            return
-        
-        self.strategy = random.choice(["shortest", "least_crowded", "safest"])
-
     def receive_message(self, performative, content):
         """Simulacija FIPA-ACL primanja poruke"""
         if performative == "INFORM":
@@ -186,77 +215,11 @@ class EvacueeAgent(mesa.Agent):
                 self.blocked_cells.add(content["location"])
                 self.panic = min(1.0, self.panic + 0.1) # obavijest da se dim širi
 
-    def step(self):
-        if self.dead or self.evacuated or self.pos is None:
-            return
-
-        if self.alarm_heard:
-            self.panic = min(1.0, self.panic + 0.05)
-
-        self.perceive_environment()
-
+    # panika, šteta, izlaz i strategija računaju se skupno u model.update_population, ovdje samo pomak
+    def move(self):
         grid = self.model.grids[self.floor]
 
-        self.panic_update()
-
-        dist = self.model.distance_to_nearest_exit(self.floor, self.pos)
-
-        if self.last_exit_dist is not None and dist is not None:
-            if dist > self.last_exit_dist:
-                self.stuck_steps += 1
-            else:
-                self.stuck_steps = 0
-
-        self.last_exit_dist = dist
-
-        if dist is not None and dist <= 3:
-            self.panic = min(self.panic, 0.4)
-
-
-        cell_heat = self.model.heat[self.floor][self.pos]
-        has_smoke = any(isinstance(a, SmokeAgent) for a in grid.get_cell_list_contents(self.pos))
-
-        if has_smoke or cell_heat > HEAT_DAMAGE_THRESHOLD:
-            heat_multiplier = 1.0 + max(0, (cell_heat - HEAT_DAMAGE_THRESHOLD) / 10.0)
-            self.smoke_steps += heat_multiplier
-
-            if cell_heat >= HEAT_DEATH_THRESHOLD:
-                print(f"Agent {self.unique_id} je umro od ekstremne topline ({cell_heat:.1f}°)")
-                self.die()
-                return
-
-            if self.smoke_steps >= SMOKE_DEATH_THRESHOLD:
-                print(f"Agent {self.unique_id} je umro od dugotrajne izloženosti dimu/toplini (akumulirana šteta: {self.smoke_steps:.1f})")
-                self.die()
-                return
-
-            if self.smoke_steps > SMOKE_TOLERANCE_STEPS:
-                panic_increase = 0.08 + (self.smoke_steps - SMOKE_TOLERANCE_STEPS) * 0.02
-                self.panic = min(1.0, self.panic + panic_increase)
-            else:
-                self.panic = min(1.0, self.panic + 0.05)
-
-        else:
-            if self.smoke_steps > 0:
-
-                self.smoke_steps = max(0, self.smoke_steps - 0.5)
-
-        # evakuacija
-        exit_key = (self.floor, self.pos[0], self.pos[1])
-        if exit_key in self.model.exits:
-            if self.model.request_exit_pass(exit_key):
-                self.evacuate()
-            else:
-                self.panic = min(1.0, self.panic + 0.03)
-            return
-
-        effective_speed = min(1.0, self.speed + self.panic * 0.3)
-        if random.random() > effective_speed:
-            return
-
-        self.adapt_strategy()
-
-        result = self.model.dijkstra_next_step(self.floor, self.pos, self)
+        result = self.model.field_next_step(self.floor, self.pos, self)
         if result is None:
             return
 
@@ -285,41 +248,33 @@ class EvacueeAgent(mesa.Agent):
             return
 
         grid = self.model.grids[self.floor]
-        self.visible_cells.clear()
-
-        sent_fire_msg = False
-
-        for dx in range(-self.vision_range, self.vision_range + 1):
-            for dy in range(-self.vision_range, self.vision_range + 1):
-                x = self.pos[0] + dx
-                y = self.pos[1] + dy
-                if not (0 <= x < grid.width and 0 <= y < grid.height):
+        r = self.vision_range
+        px, py = self.pos
+
+        x0, x1 = max(0, px - r), min(grid.width, px + r + 1)
+        y0, y1 = max(0, py - r), min(grid.height, py + r + 1)
+        self.visible_window = (self.floor, x0, x1, y0, y1)
+
+        # dim u vidnom polju = presjek okvira s indeksom dima
+        xs, ys = np.nonzero(grid.smoke[x0:x1, y0:y1])
+
+        if len(xs):
+            self.blocked_cells.update(
+                (self.floor, x0 + int(dx), y0 + int(dy))
+                for dx, dy in zip(xs, ys)
+            )
+
+            loc = (self.floor, x0 + int(xs[0]), y0 + int(ys[0]))
+            neighbor_positions = grid.get_neighborhood(self.pos, moore=True, radius=2, include_center=False)
+            for neighbor_pos in neighbor_positions:
+                if not grid.evacuees[neighbor_pos]:
                     continue
-
-                self.visible_cells.add((self.floor, x, y))
-
-                if any(isinstance(a, SmokeAgent) for a in grid.get_cell_list_contents((x, y))):
-                    loc = (self.floor, x, y)
-                    self.blocked_cells.add(loc)
-
-                    if not sent_fire_msg:
-                        neighbor_positions = grid.get_neighborhood(self.pos, moore=True, radius=2, include_center=False)
-                        for neighbor_pos in neighbor_positions:
-                            for neighbor in grid.get_cell_list_contents(neighbor_pos):
-                                if isinstance(neighbor, EvacueeAgent) and neighbor is not self:
-                                    neighbor.receive_message(
-                                        "INFORM",
-                                        {"type": "fire_detected", "location": loc, "from": self.unique_id}
-                                    )
-                        sent_fire_msg = True
-
-        to_remove = set()
-
-        for (f, x, y) in self.blocked_cells:
-            if not any(
-                isinstance(a, SmokeAgent)
-                for a in self.model.grids[f].get_cell_list_contents((x, y))
-            ):
-                to_remove.add((f, x, y))
-
-        self.blocked_cells -= to_remove
\ No newline at end of file
+                for neighbor in grid.get_cell_list_contents(neighbor_pos):
+                    if isinstance(neighbor, EvacueeAgent) and neighbor is not self:
+                        neighbor.receive_message(
+                            "INFORM",
+                            {"type": "fire_detected", "location": loc, "from": self.unique_id}
+                        )
+
+        # zapisi o ćelijama u kojima više nema dima
+        self.blocked_cells &= self.model.smoke_cells
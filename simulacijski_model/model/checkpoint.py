@@ -0,0 +1,104 @@
+"""Checkpoint modela je pickle: učitavanje izvršava kod iz datoteke, učitavaj samo vlastite checkpointe."""
+
+import gc
+import os
+import pickle
+import zlib
+from contextlib import contextmanager
+
+try:
+    from model.events import EventLog
+except ImportError:
+    from events import EventLog
+
+MAGIC = b"VASCKPT"
+# mijenja se kad se promijeni sadržaj modela, stari checkpointi se tada odbijaju
+CHECKPOINT_VERSION = 3
+
+# veze modela s okolinom, ne spremaju se nego se zadaju pri vraćanju
+RUNTIME_ATTRS = ("events", "profiler")
+# polja udaljenosti su pogledi na tablice RoomGraph, računaju se iznova u idućem koraku
+DERIVED_ATTRS = ("exit_fields",)
+
+
+class CheckpointError(ValueError):
+    pass
+
+
+# skupljač smeća bi tijekom (de)serijalizacije stotina tisuća lista grida višestruko usporio posao
+@contextmanager
+def _no_gc():
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+# cijelo stanje modela (gridovi, toplina, populacija, alarmi, brojači, nizovi, RNG) kao pickle
+def _pickle(model):
+    runtime = {
+        name: model.__dict__.pop(name)
+        for name in RUNTIME_ATTRS + DERIVED_ATTRS
+        if name in model.__dict__
+    }
+
+    profiler = runtime.get("profiler")
+    if profiler is not None:
+        profiler.detach(model)
+
+    try:
+        with _no_gc():
+            return pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)
+    finally:
+        if profiler is not None:
+            profiler.attach(model)
+        model.__dict__.update(runtime)
+
+
+def _unpickle(payload, event_log=None, profile=False):
+    with _no_gc():
+        model = pickle.loads(payload)
+    model.exit_fields = {}
+
+    model.events = event_log if event_log is not None else EventLog()
+    model.profiler = None
+    model.set_profiling(profile)
+
+    return model
+
+
+def dumps(model, level=1):
+    return MAGIC + bytes([CHECKPOINT_VERSION]) + zlib.compress(_pickle(model), level)
+
+
+def loads(data, event_log=None, profile=False):
+    header = len(MAGIC) + 1
+    if data[:len(MAGIC)] != MAGIC:
+        raise CheckpointError("nije checkpoint simulacije")
+    if data[len(MAGIC)] != CHECKPOINT_VERSION:
+        raise CheckpointError(f"checkpoint verzije {data[len(MAGIC)]}, očekivana {CHECKPOINT_VERSION}")
+
+    return _unpickle(zlib.decompress(data[header:]), event_log, profile)
+
+
+def save(model, path, level=1):
+    data = dumps(model, level)
+
+    # zapis preko privremene datoteke da se ne pročita pola checkpointa
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def load(path, event_log=None, profile=False):
+    with open(path, "rb") as f:
+        return loads(f.read(), event_log, profile)
+
+
+# kopija u istom procesu, bez kompresije; grane dalje idu neovisno (i RNG)
+def fork(model, event_log=None, profile=False):
+    return _unpickle(_pickle(model), event_log, profile)
@@ -0,0 +1,117 @@
+import json
+import queue
+import threading
+from collections import deque
+
+EVENT_TYPES = ("initialized", "evacuated", "died", "alarm_activated", "simulation_ended")
+
+
+# čitljiv zapis događaja za konzolu, isti tekst kao prije print() poziva
+def format_event(event):
+    kind = event["type"]
+
+    if kind == "initialized":
+        return (
+            "Model inicijaliziran\n"
+            f"Izlaz prizemlje : {event['ground_exits']}\n"
+            f"Izlaz 1. kat: {event['upper_exits']}"
+        )
+
+    if kind == "evacuated":
+        return (
+            f"EVAKUIRAN agent {event['agent']} | izlaz: {event['exit']} | "
+            f"vrijeme evakuacije: {event['evacuation_time']} | ukupno evakuiranih: {event['total_evacuated']}"
+        )
+
+    if kind == "died":
+        if event["cause"] == "heat":
+            return f"Agent {event['agent']} je umro od ekstremne topline ({event['heat']:.1f}°)"
+        return (
+            f"Agent {event['agent']} je umro od dugotrajne izloženosti dimu/toplini "
+            f"(akumulirana šteta: {event['smoke_steps']:.1f})"
+        )
+
+    if kind == "alarm_activated":
+        return f"Alarm {event['alarm']} aktiviran (kat {event['floor']}, {event['x']}, {event['y']})"
+
+    if kind == "simulation_ended":
+        status_msg = "ZAVRŠENO (Svi procesuirani)" if event["status"] == "completed" else "PREKINUTO (Izlazi blokirani)"
+        return (
+            f"\n{status_msg}\n"
+            "--- Izvještaj o evakuaciji ---\n"
+            f"Uspješno evakuirani: {event['evacuated']}\n"
+            f"Poginuli u dimu: {event['dead']}\n"
+            f"Zarobljeni unutra: {event['trapped']}\n"
+            f"Stopa preživljavanja: {event['survival_rate']:.2f}%\n"
+            f"Trajanje simulacije: {event['step']} koraka\n"
+        )
+
+    return json.dumps(event, ensure_ascii=False)
+
+
+class EventLog:
+    """Događaji simulacije u prstenastom spremniku, s opcionalnim asinkronim zapisom u JSONL"""
+
+    def __init__(self, path=None, capacity=10000, flush_every=256, echo=False, enabled=True):
+        self.enabled = enabled
+        self.echo = echo
+        self.path = path
+        self.flush_every = flush_every
+
+        self.buffer = deque(maxlen=capacity)
+        self.counts = dict.fromkeys(EVENT_TYPES, 0)
+
+        self._pending = []
+        self._queue = None
+        self._writer = None
+
+        # zapis u datoteku radi zasebna dretva da simulacija ne čeka na disk
+        if enabled and path is not None:
+            self._queue = queue.Queue()
+            self._writer = threading.Thread(target=self._write_loop, daemon=True)
+            self._writer.start()
+
+    def emit(self, kind, step, **data):
+        if not self.enabled:
+            return
+
+        event = {"type": kind, "step": step}
+        event.update(data)
+
+        self.buffer.append(event)
+        self.counts[kind] = self.counts.get(kind, 0) + 1
+
+        if self.echo:
+            print(format_event(event))
+
+        if self._queue is not None:
+            self._pending.append(event)
+            if len(self._pending) >= self.flush_every:
+                self.flush()
+
+    def events(self, kind=None):
+        if kind is None:
+            return list(self.buffer)
+        return [e for e in self.buffer if e["type"] == kind]
+
+    def flush(self):
+        if self._queue is not None and self._pending:
+            self._queue.put(self._pending)
+            self._pending = []
+
+    def close(self):
+        self.flush()
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join()
+            self._writer = None
+            self._queue = None
+
+    def _write_loop(self):
+        with open(self.path, "a", encoding="utf-8") as f:
+            while True:
+                batch = self._queue.get()
+                if batch is None:
+                    break
+                f.write("".join(json.dumps(e, ensure_ascii=False) + "\n" for e in batch))
+                f.flush()
@@ -0,0 +1,595 @@
+import heapq
+from bisect import bisect_right
+
+import numpy as np
+
+try:
+    from model.routing import EMERGENCY_EXIT_PENALTY, INF
+except ImportError:
+    from routing import EMERGENCY_EXIT_PENALTY, INF
+
+# čvor u popravku (rhs + susjedi) košta otprilike kao ovoliko čvorova Dijkstre
+REPAIR_COST_RATIO = 4
+MAX_BACKOFF = 16
+MIN_REPAIR_SIZE = 5000
+
+
+class RoomGraph:
+    """Hijerarhijski graf zgrade: unutrašnjost soba sažeta je na prolaze (vrata),
+    hodnici, vrata, stepenice i izlazi ostaju na razini ćelija"""
+
+    def __init__(self, model, masks):
+        self.model = model
+
+        # svi katovi u jednom ravnom nizu s rubom od jedne ćelije, susjedi su i±1 i i±stride
+        self.floor_ids = sorted(model.grids)
+        self.stride = max(model.grids[fid].height for fid in self.floor_ids) + 2
+        self.bases = []
+        size = 0
+        for fid in self.floor_ids:
+            self.bases.append(size)
+            size += (model.grids[fid].width + 2) * self.stride
+        self.size = size
+
+        interior = self._flat(lambda fid: self._interior_mask(fid, masks[fid]), False)
+        rooms = self._flat(lambda fid: masks[fid]["room"], -1)
+        wall = self._flat(lambda fid: model.grids[fid].wall, True)
+        exits = np.zeros(size, dtype=bool)
+        for fid, x, y in model.exits:
+            exits[self.index(fid, (x, y))] = True
+
+        self.wall = wall.tolist()
+        self.is_exit = exits.tolist()
+
+        # hodnička mreža: ćelije koje nisu zid, rub, izlaz ni unutrašnjost sobe
+        self.backbone = (~wall & ~exits & ~interior).tolist()
+
+        region = self._label_regions(interior, rooms)
+        self.region_arr = region
+        self.region = region.tolist()
+        self._build_regions(region, wall)
+
+        self.stair_sources = {
+            self.index(tfid, (x, y)): [self.index(*self._split(src)) for src in sources]
+            for (tfid, x, y), sources in model.stair_sources.items()
+        }
+        self.stair_targets = {}
+        for t, sources in self.stair_sources.items():
+            for src in sources:
+                self.stair_targets.setdefault(src, []).append(t)
+
+        # ulazak na stepenice je prelazak na drugi kat, pa ćelija stepenica vrijedi samo preko odmorišta
+        walk_in = np.array(self.backbone)
+        walk_in[list(self.stair_targets)] = False
+        self.walk_in = walk_in.tolist()
+        self.backbone_count = sum(self.backbone)
+
+        # odmorište koje je i samo stepenice (okno kroz više katova): tko na njemu stoji može sići s njega
+        # ili se vratiti stepenicama, pa ta vrijednost dobiva svoj čvor iza ravnog niza
+        self.landings = sorted(t for t in self.stair_sources if t in self.stair_targets)
+        self.landing_states = [(fid, *pos) for fid, pos in map(self.state, self.landings)]
+        self.stand = [0] * size
+        for k, t in enumerate(self.landings):
+            self.stand[t] = size + k
+        self.node_count = size + len(self.landings)
+        self.repairable = self.backbone + [True] * len(self.landings)
+
+        self.tables = {}
+
+    # unutrašnjost sobe: ćelije sobe koje nisu zid, vrata, hodnik, izlaz ni stepenice
+    def _interior_mask(self, fid, floor_masks):
+        grid = self.model.grids[fid]
+        return (
+            (floor_masks["room"] >= 0)
+            & ~grid.wall
+            & ~grid.corridor
+            & ~floor_masks["door"]
+            & ~floor_masks["exit"]
+            & ~floor_masks["stair"]
+        )
+
+    @staticmethod
+    def _split(state):
+        fid, x, y = state
+        return fid, (x, y)
+
+    def index(self, fid, pos):
+        base = self.bases[self.floor_ids.index(fid)]
+        return base + (pos[0] + 1) * self.stride + pos[1] + 1
+
+    def state(self, i):
+        k = bisect_right(self.bases, i) - 1
+        x, y = divmod(i - self.bases[k], self.stride)
+        return self.floor_ids[k], (x - 1, y - 1)
+
+    # slojevi katova (w, h) u ravni niz s rubom
+    def _flat(self, layer, fill):
+        parts = []
+        for fid in self.floor_ids:
+            arr = np.asarray(layer(fid))
+            w, h = arr.shape
+            padded = np.full((w + 2, self.stride), fill, dtype=arr.dtype)
+            padded[1:w + 1, 1:h + 1] = arr
+            parts.append(padded.ravel())
+        return np.concatenate(parts)
+
+    def floor_view(self, flat, fid):
+        k = self.floor_ids.index(fid)
+        grid = self.model.grids[fid]
+        w, h = grid.width, grid.height
+        block = flat[self.bases[k]:self.bases[k] + (w + 2) * self.stride]
+        return block.reshape(w + 2, self.stride)[1:w + 1, 1:h + 1]
+
+    # sobe čije se unutrašnjosti dodiruju (bez zida između) postaju jedna regija
+    def _label_regions(self, interior, rooms):
+        parent = {}
+
+        def find(r):
+            while parent.setdefault(r, r) != r:
+                parent[r] = parent[parent[r]]
+                r = parent[r]
+            return r
+
+        idx = np.flatnonzero(interior)
+        for r in np.unique(rooms[idx]).tolist():
+            find(r)
+
+        for offset in (1, self.stride):
+            a = idx[interior[idx + offset]]
+            b = a + offset
+            touching = rooms[a] != rooms[b]
+            for ra, rb in zip(rooms[a][touching].tolist(), rooms[b][touching].tolist()):
+                parent[find(ra)] = find(rb)
+
+        roots = sorted({find(r) for r in parent})
+        label = {root: n for n, root in enumerate(roots)}
+
+        region = np.full(self.size, -1, dtype=np.int64)
+        region[idx] = [label[find(r)] for r in rooms[idx].tolist()]
+        return region
+
+    # ćelije, prolazi i raspored tablica udaljenosti za svaku regiju
+    def _build_regions(self, region, wall):
+        count = int(region.max()) + 1 if region.size else 0
+        order = np.argsort(region, kind="stable")
+        starts = np.searchsorted(region[order], np.arange(count + 1))
+
+        self.local = [0] * self.size
+        self.cells = []
+        self.gates = []
+        self.gate_nbrs = []
+        self.offsets = []
+        self.transit_regions = {}
+        self.gate_regions = {}
+
+        pair_cells = []
+        pair_gates = []
+        offset = 0
+        steps = (1, -1, self.stride, -self.stride)
+
+        for r in range(count):
+            cells = order[starts[r]:starts[r + 1]].tolist()
+            for j, i in enumerate(cells):
+                self.local[i] = j
+
+            members = set(cells)
+            gates = sorted({
+                i + s for i in cells for s in steps
+                if i + s not in members and not wall[i + s]
+            })
+
+            # za svaki prolaz lokalni indeksi susjednih ćelija unutrašnjosti
+            nbrs = [[self.local[g + s] for s in steps if g + s in members] for g in gates]
+
+            self.cells.append(cells)
+            self.gates.append(gates)
+            self.gate_nbrs.append(nbrs)
+            self.offsets.append(offset)
+
+            for g in gates:
+                self.gate_regions.setdefault(g, []).append(r)
+                if len(gates) > 1:
+                    self.transit_regions.setdefault(g, []).append(r)
+
+            pair_cells.append(np.tile(cells, len(gates)))
+            pair_gates.append(np.repeat(gates, len(cells)))
+            offset += len(gates) * len(cells)
+
+        self.offsets.append(offset)
+        self.pair_cells = np.concatenate(pair_cells) if pair_cells else np.zeros(0, dtype=np.int64)
+        self.pair_gates = np.concatenate(pair_gates) if pair_gates else np.zeros(0, dtype=np.int64)
+        self.region_count = count
+
+    # tablice po strategiji su izvedene, nakon vraćanja iz checkpointa grade se iznova
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["tables"] = {}
+        return state
+
+    # promijenjene ćelije čekaju da se polje pojedine strategije sljedeći put traži
+    def mark_changed(self, cells):
+        for tables in self.tables.values():
+            tables["pending"].update(cells)
+
+    # cijene, prolaznost i tablice svih regija iz početka
+    def rebuild(self, strategy):
+        model = self.model
+        cost_l = self._flat(lambda fid: model.cost_layer(fid, strategy), INF).tolist()
+        open_l = self._flat(lambda fid: model.grids[fid].open_mask(), False).tolist()
+
+        tables = {
+            "cost_l": cost_l,
+            "open_l": open_l,
+            "pair_t": np.full(self.offsets[-1], INF),
+            "transit": [None] * self.region_count,
+            "stair_cost": {i: model.stair_cost(*self.state(i)) for i in self.stair_sources},
+            "pending": set(),
+            "backoff": 0,
+            "skip": 0,
+        }
+
+        for r in range(self.region_count):
+            self._region_tables(r, tables, cost_l, open_l)
+
+        self.tables[strategy] = tables
+        return tables
+
+    # obrnuti Dijkstra iz svakog prolaza kroz unutrašnjost regije
+    def _region_tables(self, r, tables, cost, open_):
+        cells = self.cells[r]
+        gates = self.gates[r]
+        c = len(cells)
+        region = self.region
+        local = self.local
+        steps = (1, -1, self.stride, -self.stride)
+
+        block = np.full((len(gates), c), INF)
+
+        for k, g in enumerate(gates):
+            if not open_[g]:
+                continue
+
+            t = [INF] * c
+            pq = []
+            for j in self.gate_nbrs[r][k]:
+                if cost[g] < t[j]:
+                    t[j] = cost[g]
+                    heapq.heappush(pq, (t[j], j))
+
+            while pq:
+                d, j = heapq.heappop(pq)
+                if d > t[j]:
+                    continue
+
+                i = cells[j]
+                if not open_[i]:
+                    continue
+
+                nd = d + cost[i]
+                for s in steps:
+                    n = i + s
+                    if region[n] == r and nd < t[local[n]]:
+                        t[local[n]] = nd
+                        heapq.heappush(pq, (nd, local[n]))
+
+            block[k] = t
+
+        start = self.offsets[r]
+        tables["pair_t"][start:start + block.size] = block.ravel()
+
+        # prolaz kroz sobu s više vrata od prolaza h do prolaza g, u oba smjera pretrage
+        if len(gates) > 1:
+            into = {g: [] for g in gates}
+            out_of = {h: [] for h in gates}
+            for k, g in enumerate(gates):
+                for h, nbrs in zip(gates, self.gate_nbrs[r]):
+                    if h == g:
+                        continue
+                    w = min((cost[cells[j]] + block[k, j] for j in nbrs if open_[cells[j]]), default=INF)
+                    if w < INF:
+                        into[g].append((h, float(w)))
+                        out_of[h].append((k, float(w)))
+            tables["transit"][r] = (into, out_of)
+
+    def region_table(self, tables, r):
+        start = self.offsets[r]
+        return tables["pair_t"][start:self.offsets[r + 1]].reshape(len(self.gates[r]), len(self.cells[r]))
+
+    # udaljenost do izlaza za sve ćelije; nakon prvog računanja samo popravak oko promjena
+    def distances(self, strategy):
+        tables = self.tables.get(strategy)
+        if tables is None:
+            tables = self.rebuild(strategy)
+            return self._full(tables)
+
+        if not tables["pending"]:
+            return tables["out"]
+
+        changes = self._apply_pending(strategy, tables)
+
+        # na maloj mreži hodnika puni Dijkstra je jeftiniji od vođenja stanja popravka
+        if self.backbone_count < MIN_REPAIR_SIZE:
+            return self._full(tables)
+
+        # nakon neuspjelog popravka nekoliko poziva ide ravno na puno računanje
+        if tables["skip"] > 0:
+            tables["skip"] -= 1
+            return self._full(tables)
+
+        if not self._repair(tables, *changes):
+            tables["backoff"] = min(2 * tables["backoff"] + 1, MAX_BACKOFF)
+            tables["skip"] = tables["backoff"]
+            return self._full(tables)
+
+        tables["backoff"] = 0
+        return tables["out"]
+
+    # vrijednosti stajanja na odmorištima koja su i sama stepenice, po (kat, x, y)
+    def landing_values(self, strategy):
+        return dict(zip(self.landing_states, self.tables[strategy]["landing"]))
+
+    # Dijkstra po hodnicima iz svih izlaza, sobe iz tablica
+    def _full(self, tables):
+        model = self.model
+        cost = tables["cost_l"]
+        open_ = tables["open_l"]
+        stair_cost = tables["stair_cost"]
+        transit = tables["transit"]
+        backbone = self.backbone
+        walk_in = self.walk_in
+        stand = self.stand
+        stride = self.stride
+        size = self.size
+
+        dist = [INF] * self.node_count
+        done = bytearray(self.node_count)
+        pq = []
+
+        for fid, x, y in model.exits:
+            i = self.index(fid, (x, y))
+            dist[i] = 0 if (fid, x, y) in model.final_exits else EMERGENCY_EXIT_PENALTY
+            heapq.heappush(pq, (dist[i], i))
+
+        while pq:
+            d, s = heapq.heappop(pq)
+            if done[s]:
+                continue
+            done[s] = 1
+
+            # stajanje na odmorištu-stepenicama: odavde dalje samo stepenice koje vode na njega
+            if s >= size:
+                t = self.landings[s - size]
+                if open_[t]:
+                    sd = d + stair_cost[t]
+                    for src in self.stair_sources[t]:
+                        if backbone[src] and sd < dist[src]:
+                            dist[src] = sd
+                            heapq.heappush(pq, (sd, src))
+                continue
+
+            # susjed ulazi u ovu ćeliju samo ako je prolazna; s odmorišta-stepenica se u nju silazi
+            if open_[s]:
+                nd = d + cost[s]
+                for n in (s + 1, s - 1, s + stride, s - stride):
+                    to = n if walk_in[n] else stand[n]
+                    if to and nd < dist[to]:
+                        dist[to] = nd
+                        heapq.heappush(pq, (nd, to))
+
+                for r in self.transit_regions.get(s, ()):
+                    for h, w in transit[r][0][s]:
+                        to = h if walk_in[h] else stand[h]
+                        if to and d + w < dist[to]:
+                            dist[to] = d + w
+                            heapq.heappush(pq, (d + w, to))
+
+            # tko stoji na odmorištu-stepenicama može se i vratiti njima
+            if stand[s]:
+                if d < dist[stand[s]]:
+                    dist[stand[s]] = d
+                    heapq.heappush(pq, (d, stand[s]))
+                continue
+
+            # stepenice koje vode na ovu ćeliju, samo dok je odmorište prolazno kao i za pomak
+            sources = self.stair_sources.get(s)
+            if sources and open_[s]:
+                sd = d + stair_cost[s]
+                for src in sources:
+                    if backbone[src] and sd < dist[src]:
+                        dist[src] = sd
+                        heapq.heappush(pq, (sd, src))
+
+        # stanje pretrage ostaje za popravke u sljedećim koracima (g = rhs, sve konzistentno)
+        tables["g"] = dist
+        tables["rhs"] = list(dist)
+        tables["landing"] = dist[size:]
+
+        # unutrašnjost soba: najbolji prolaz + udaljenost od prolaza
+        out = np.array(dist[:size])
+        if self.pair_cells.size:
+            np.minimum.at(out, self.pair_cells, out[self.pair_gates] + tables["pair_t"])
+        tables["out"] = out
+        return out
+
+    # nove cijene za promijenjene ćelije; tablice soba i stepenice samo gdje se nešto stvarno promijenilo
+    def _apply_pending(self, strategy, tables):
+        model = self.model
+        cost = tables["cost_l"]
+        open_ = tables["open_l"]
+
+        pending = tables["pending"]
+        tables["pending"] = set()
+
+        by_floor = {}
+        for fid, x, y in pending:
+            by_floor.setdefault(fid, []).append((x, y))
+
+        edge_changed = []
+        for fid, cells in by_floor.items():
+            xs, ys = np.array(cells).T
+            new_cost = model.cost_layer(fid, strategy)[xs, ys].tolist()
+            new_open = model.grids[fid].open_mask()[xs, ys].tolist()
+
+            for (x, y), c, o in zip(cells, new_cost, new_open):
+                i = self.index(fid, (x, y))
+                if c != cost[i] or o != open_[i]:
+                    cost[i] = c
+                    open_[i] = o
+                    edge_changed.append(i)
+
+        dirty = set()
+        for i in edge_changed:
+            if self.region[i] >= 0:
+                dirty.add(self.region[i])
+            dirty.update(self.gate_regions.get(i, ()))
+
+        for r in dirty:
+            self._region_tables(r, tables, cost, open_)
+
+        stair_changed = []
+        stair_cost = tables["stair_cost"]
+        for t in self.stair_sources:
+            c = model.stair_cost(*self.state(t))
+            if c != stair_cost[t]:
+                stair_cost[t] = c
+                stair_changed.append(t)
+
+        return edge_changed, dirty, stair_changed
+
+    # najmanja vrijednost preko ćelija, prolaza kroz sobe i stepenica iz kojih se dolazi u v
+    def _rhs(self, v, tables):
+        g = tables["g"]
+
+        # stajanje na odmorištu-stepenicama: silazak s njega ili povratak stepenicama
+        if v >= self.size:
+            t = self.landings[v - self.size]
+            return min(g[t], self._walk_rhs(t, tables))
+
+        best = self._walk_rhs(v, tables) if self.walk_in[v] else INF
+
+        open_ = tables["open_l"]
+        stair_cost = tables["stair_cost"]
+        for t in self.stair_targets.get(v, ()):
+            if open_[t]:
+                d = g[self.stand[t] or t] + stair_cost[t]
+                if d < best:
+                    best = d
+
+        return best
+
+    # najmanja vrijednost koraka iz v u susjednu ćeliju ili kroz sobu
+    def _walk_rhs(self, v, tables):
+        g = tables["g"]
+        cost = tables["cost_l"]
+        open_ = tables["open_l"]
+        best = INF
+
+        for s in (v + 1, v - 1, v + self.stride, v - self.stride):
+            if open_[s] and (self.backbone[s] or self.is_exit[s]):
+                d = g[s] + cost[s]
+                if d < best:
+                    best = d
+
+        for r in self.transit_regions.get(v, ()):
+            gates = self.gates[r]
+            for k, w in tables["transit"][r][1][v]:
+                d = g[gates[k]] + w
+                if d < best:
+                    best = d
+
+        return best
+
+    # čvorovi čija vrijednost ovisi o s
+    def _children(self, s, tables):
+        if s >= self.size:
+            yield from self.stair_sources[self.landings[s - self.size]]
+            return
+
+        for n in (s + 1, s - 1, s + self.stride, s - self.stride):
+            to = n if self.walk_in[n] else self.stand[n]
+            if to:
+                yield to
+
+        for r in self.transit_regions.get(s, ()):
+            for h, _ in tables["transit"][r][0][s]:
+                to = h if self.walk_in[h] else self.stand[h]
+                if to:
+                    yield to
+
+        # stepenice na odmorište-stepenice polaze od čvora stajanja, ne od same ćelije
+        if self.stand[s]:
+            yield self.stand[s]
+        else:
+            yield from self.stair_sources.get(s, ())
+
+    # LPA* bez heuristike: popravak g samo za čvorove do kojih dođe promjena cijene
+    def _repair(self, tables, edge_changed, dirty, stair_changed):
+        g = tables["g"]
+        rhs = tables["rhs"]
+        repairable = self.repairable
+
+        # prolaznost odmorišta mijenja i stepenice koje vode na njega
+        touched = set()
+        for i in edge_changed:
+            touched.update(self._children(i, tables))
+            touched.update(self.stair_sources.get(i, ()))
+
+        for r in dirty:
+            if len(self.gates[r]) > 1:
+                touched.update(self.gates[r])
+
+        for t in stair_changed:
+            touched.update(self.stair_sources[t])
+
+        pq = []
+
+        def update(v):
+            if not repairable[v]:
+                return
+            rhs[v] = self._rhs(v, tables)
+            if g[v] != rhs[v]:
+                heapq.heappush(pq, (min(g[v], rhs[v]), v))
+
+        for v in touched:
+            update(v)
+
+        # popravak je skuplji po čvoru od Dijkstre, preko budžeta se više isplati sve iz početka
+        budget = self.backbone_count // REPAIR_COST_RATIO
+        changed_g = set()
+
+        while pq:
+            k, v = heapq.heappop(pq)
+            if g[v] == rhs[v] or k != min(g[v], rhs[v]):
+                continue
+
+            budget -= 1
+            if budget < 0:
+                return False
+
+            if g[v] > rhs[v]:
+                g[v] = rhs[v]
+            else:
+                g[v] = INF
+                update(v)
+
+            changed_g.add(v)
+            for n in self._children(v, tables):
+                update(n)
+
+        out = tables["out"]
+        landing = tables["landing"]
+        for v in changed_g:
+            if v < self.size:
+                out[v] = g[v]
+            else:
+                landing[v - self.size] = g[v]
+
+        refill = set(dirty)
+        for v in changed_g:
+            refill.update(self.gate_regions.get(v, ()))
+
+        for r in refill:
+            gate_dist = np.array([g[i] for i in self.gates[r]])
+            out[self.cells[r]] = (gate_dist[:, None] + self.region_table(tables, r)).min(axis=0)
+
+        return True
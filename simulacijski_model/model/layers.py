@@ -0,0 +1,120 @@
+import numpy as np
+from mesa.space import MultiGrid
+
+try:
+    from model.agent import EvacueeAgent
+except ImportError:
+    from agent import EvacueeAgent
+
+NEIGHBORS4 = ((1, 0), (-1, 0), (0, 1), (0, -1))
+NEIGHBORS8 = NEIGHBORS4 + ((1, 1), (1, -1), (-1, 1), (-1, -1))
+
+
+class LayeredGrid(MultiGrid):
+    """MultiGrid s agentima samo za ljude i alarme, zidovi, dim i ventilacija su NumPy slojevi"""
+
+    def __init__(self, width, height, torus=False, floor_id=0, smoke_cells=None, changed_cells=None):
+        super().__init__(width, height, torus)
+
+        # indeks ćelija s dimom kao (kat, x, y), model ga dijeli između katova
+        self.floor_id = floor_id
+        self.smoke_cells = smoke_cells if smoke_cells is not None else set()
+        self.evacuee_cells = set()
+
+        # ćelije kojima se promijenio sloj bitan za cijenu puta, model ih prazni kad ih preuzme
+        self.changed_cells = changed_cells if changed_cells is not None else set()
+
+        self.wall = np.zeros((width, height), dtype=bool)
+        self.corridor = np.zeros((width, height), dtype=bool)
+        self.ventilation = np.zeros((width, height), dtype=bool)
+        self.smoke = np.zeros((width, height), dtype=np.int16)
+        self.evacuees = np.zeros((width, height), dtype=np.int16)
+
+    # u checkpoint idu samo zauzete ćelije; prazne liste i cache susjedstva grade se iznova
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_grid"] = [
+            (x, y, cell)
+            for x, column in enumerate(self._grid)
+            for y, cell in enumerate(column)
+            if cell
+        ]
+        state["_neighborhood_cache"] = {}
+        state["_empties_built"] = False
+        state.pop("_empties", None)
+        return state
+
+    def __setstate__(self, state):
+        occupied = state.pop("_grid")
+        self.__dict__.update(state)
+
+        self._grid = [[[] for _ in range(self.height)] for _ in range(self.width)]
+        for x, y, cell in occupied:
+            self._grid[x][y] = cell
+
+    def place_agent(self, agent, pos):
+        placed = agent.pos is None
+        super().place_agent(agent, pos)
+        if placed:
+            self._track(agent, pos, 1)
+
+    def remove_agent(self, agent):
+        pos = agent.pos
+        super().remove_agent(agent)
+        self._track(agent, pos, -1)
+
+    # sloj broja ljudi prati agente kad se postave, pomaknu ili maknu
+    def _track(self, agent, pos, delta):
+        if not isinstance(agent, EvacueeAgent):
+            return
+
+        key = (self.floor_id, pos[0], pos[1])
+        self.changed_cells.add(key)
+
+        self.evacuees[pos] += delta
+        if self.evacuees[pos] > 0:
+            self.evacuee_cells.add(key)
+        else:
+            self.evacuee_cells.discard(key)
+
+    # dim nije agent, samo broj izvora po ćeliji
+    def add_smoke(self, pos):
+        key = (self.floor_id, pos[0], pos[1])
+        self.changed_cells.add(key)
+        self.smoke[pos] += 1
+        self.smoke_cells.add(key)
+
+    def clear_smoke(self, pos):
+        key = (self.floor_id, pos[0], pos[1])
+        self.changed_cells.add(key)
+        self.smoke[pos] = 0
+        self.smoke_cells.discard(key)
+
+    # ćelije u koje se može ući bez obzira na agenta (kao passable bez agenta)
+    def open_mask(self):
+        return ~self.wall & (self.smoke == 0) & (self.evacuees < 3)
+
+
+# pomak sloja za (dx, dy): out[x, y] = arr[x - dx, y - dy], izvan grida je 0
+def shift(arr, dx, dy):
+    out = np.zeros_like(arr)
+    w, h = arr.shape
+
+    if abs(dx) >= w or abs(dy) >= h:
+        return out
+
+    src_x = slice(max(0, -dx), w - max(0, dx))
+    src_y = slice(max(0, -dy), h - max(0, dy))
+    dst_x = slice(max(0, dx), w - max(0, -dx))
+    dst_y = slice(max(0, dy), h - max(0, -dy))
+
+    out[dst_x, dst_y] = arr[src_x, src_y]
+    return out
+
+
+# zbroj vrijednosti susjeda za svaku ćeliju
+def neighbor_sum(arr, offsets=NEIGHBORS4):
+    total = np.zeros(arr.shape, dtype=np.result_type(arr, np.int16))
+    for dx, dy in offsets:
+        total += shift(arr, dx, dy)
+    return total
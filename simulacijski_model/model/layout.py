@@ -0,0 +1,359 @@
+import hashlib
+import io
+import json
+import os
+
+import numpy as np
+
+try:
+    from model.routing import flood_reach
+except ImportError:
+    from routing import flood_reach
+
+# mijenja se kad se promijeni način prevođenja, stari cache se tada ne koristi
+COMPILER_VERSION = 2
+MASK_NAMES = ("wall", "corridor", "door", "exit", "stair", "room")
+
+_memory_cache = {}
+
+
+class LayoutError(ValueError):
+    pass
+
+
+class CompiledLayout:
+    """Prevedeni layout: maske po katu, indeks soba i izvještaj o povezanosti"""
+
+    def __init__(self, layout, masks, rooms, report, digest=None):
+        self.layout = layout
+        self.masks = masks
+        self.rooms = rooms
+        self.report = report
+        self.digest = digest
+
+    def cells(self, name):
+        return {
+            (fid, int(x), int(y))
+            for fid, floor_masks in self.masks.items()
+            for x, y in zip(*np.nonzero(floor_masks[name]))
+        }
+
+    # ćelije hodnika uvijek istim redom, da slučajni odabir ovisi samo o seedu
+    def ordered_cells(self, name):
+        return [
+            (fid, int(x), int(y))
+            for fid in sorted(self.masks)
+            for x, y in zip(*np.nonzero(self.masks[fid][name]))
+        ]
+
+
+# ista pravila kao prije u EvaluationModel.__init__, ali nad skupovima bez agenata
+def _build_geometry(layout):
+    floors = {floor["floor_id"]: floor for floor in layout["floors"]}
+    dims = {fid: (f["dimensions"]["width"], f["dimensions"]["height"]) for fid, f in floors.items()}
+
+    walls = set()
+    corridor_cells = set()
+    exits = set()
+    stairs = {}
+    doors = set()
+
+    # vanjski zidovi
+    for fid, (w, h) in dims.items():
+        for x in range(w):
+            walls.add((fid, x, 0))
+            walls.add((fid, x, h - 1))
+        for y in range(h):
+            walls.add((fid, 0, y))
+            walls.add((fid, w - 1, y))
+
+    for fid, floor in floors.items():
+        w, h = dims[fid]
+        for corridor in floor.get("corridors", []):
+            half = int(corridor.get("width", 1)) // 2
+
+            for p in corridor.get("path", []):
+                for dx in range(-half, half + 1):
+                    for dy in range(-half, half + 1):
+                        x, y = p["x"] + dx, p["y"] + dy
+                        if 0 <= x < w and 0 <= y < h:
+                            corridor_cells.add((fid, x, y))
+                            walls.discard((fid, x, y))
+
+    for fid, floor in floors.items():
+        for exit_data in floor.get("exits", []):
+            key = (fid, exit_data["position"]["x"], exit_data["position"]["y"])
+            exits.add(key)
+            walls.discard(key)
+
+    for fid, floor in floors.items():
+        for stair_data in floor.get("stairs", []):
+            key = (fid, stair_data["position"]["x"], stair_data["position"]["y"])
+            stairs[key] = stair_data["connects_to_floor"]
+            walls.discard(key)
+
+    # prostorije
+    for fid, floor in floors.items():
+        for room in floor.get("rooms", []):
+            b = room["bounds"]
+            for x in range(b["x"], b["x"] + b["width"]):
+                for y in range(b["y"], b["y"] + b["height"]):
+                    is_edge = (
+                        x == b["x"]
+                        or x == b["x"] + b["width"] - 1
+                        or y == b["y"]
+                        or y == b["y"] + b["height"] - 1
+                    )
+                    if is_edge and (fid, x, y) not in corridor_cells:
+                        walls.add((fid, x, y))
+
+            for door in room.get("doors", []):
+                key = (fid, door["x"], door["y"])
+                doors.add(key)
+                walls.discard(key)
+
+    return dims, walls, corridor_cells, exits, stairs, doors
+
+
+# ćelija (kat, x, y) mora biti na postojećem katu i unutar njegovog grida
+def _check_cell(errors, dims, what, fid, x, y):
+    if fid not in dims:
+        errors.append(f"{what} je na nepostojećem katu {fid}")
+        return
+
+    w, h = dims[fid]
+    if not (0 <= x < w and 0 <= y < h):
+        errors.append(f"{what} na katu {fid} je izvan grida ({x}, {y})")
+
+
+def _fire_source_errors(dims, sources):
+    errors = []
+    for fid, x, y in sources:
+        _check_cell(errors, dims, "izvor požara", fid, x, y)
+    return errors
+
+
+def _validate(layout, dims):
+    errors = []
+
+    floor_ids = [floor["floor_id"] for floor in layout["floors"]]
+    duplicates = sorted({fid for fid in floor_ids if floor_ids.count(fid) > 1})
+    if duplicates:
+        errors.append(f"katovi s istim floor_id: {duplicates}")
+    if 0 not in dims:
+        errors.append("layout nema prizemlje (floor_id 0)")
+
+    for floor in layout["floors"]:
+        fid = floor["floor_id"]
+        w, h = dims[fid]
+
+        def inside(x, y):
+            return 0 <= x < w and 0 <= y < h
+
+        for exit_data in floor.get("exits", []):
+            x, y = exit_data["position"]["x"], exit_data["position"]["y"]
+            if not inside(x, y):
+                errors.append(f"izlaz {exit_data.get('id')} na katu {fid} je izvan grida ({x}, {y})")
+
+        for stair_data in floor.get("stairs", []):
+            x, y = stair_data["position"]["x"], stair_data["position"]["y"]
+            target = stair_data["connects_to_floor"]
+            if not inside(x, y):
+                errors.append(f"stepenice {stair_data.get('id')} na katu {fid} su izvan grida ({x}, {y})")
+            if target not in dims:
+                errors.append(f"stepenice {stair_data.get('id')} na katu {fid} vode na nepostojeći kat {target}")
+
+        for room in floor.get("rooms", []):
+            b = room["bounds"]
+            if not (inside(b["x"], b["y"]) and inside(b["x"] + b["width"] - 1, b["y"] + b["height"] - 1)):
+                errors.append(f"soba {room['id']} na katu {fid} izlazi iz grida")
+
+            for door in room.get("doors", []):
+                dx, dy = door["x"], door["y"]
+                on_x_edge = dx in (b["x"], b["x"] + b["width"] - 1) and b["y"] <= dy < b["y"] + b["height"]
+                on_y_edge = dy in (b["y"], b["y"] + b["height"] - 1) and b["x"] <= dx < b["x"] + b["width"]
+                if not (on_x_edge or on_y_edge):
+                    errors.append(f"vrata ({dx}, {dy}) sobe {room['id']} na katu {fid} nisu na rubu sobe")
+
+    for v in layout.get("ventilation", []):
+        _check_cell(errors, dims, "ventilacija", v["floor"], v["x"], v["y"])
+
+    for alarm_data in layout.get("alarms", []):
+        _check_cell(errors, dims, f"alarm {alarm_data.get('id', '')}".rstrip(),
+                    alarm_data["floor"], alarm_data["x"], alarm_data["y"])
+
+    hazards = layout.get("hazards", {})
+    errors += _fire_source_errors(dims, [
+        (source["floor"], source["position"]["x"], source["position"]["y"])
+        for source in hazards.get("fire_sources", [])
+    ])
+
+    for fid in hazards.get("random_fire_sources", {}).get("allowed_floors", []):
+        if fid not in dims:
+            errors.append(f"slučajni požar dopušten na nepostojećem katu {fid}")
+
+    if not any(floor.get("exits") for floor in layout["floors"]):
+        errors.append("layout nema nijedan izlaz")
+
+    if errors:
+        raise LayoutError("neispravan layout:\n  " + "\n  ".join(errors))
+
+
+# ćelije iz kojih se kroz ne-zidove i stepenice može doći do nekog izlaza, isto pravilo kao ReachabilityMap
+def _static_reachability(masks, exits, stairs):
+    reach = {fid: np.zeros_like(m["wall"]) for fid, m in masks.items()}
+    open_ = {fid: ~m["wall"] for fid, m in masks.items()}
+    enter = {fid: open_[fid] & ~m["stair"] for fid, m in masks.items()}
+
+    for fid, x, y in exits:
+        reach[fid][x, y] = True
+
+    stair_pairs = [
+        ((fid, x, y), (target, x, y))
+        for (fid, x, y), target in stairs.items()
+        if not masks[target]["wall"][x, y]
+    ]
+
+    flood_reach(reach, enter, stair_pairs, open_)
+    return reach
+
+
+# izvori požara zadani izvan layouta (npr. --fire) provjeravaju se istim pravilima
+def validate_fire_sources(compiled, sources):
+    dims = {fid: floor_masks["wall"].shape for fid, floor_masks in compiled.masks.items()}
+    errors = _fire_source_errors(dims, sources)
+    if errors:
+        raise LayoutError("neispravni izvori požara:\n  " + "\n  ".join(errors))
+
+
+def compile_layout(layout, digest=None):
+    dims, walls, corridor_cells, exits, stairs, doors = _build_geometry(layout)
+    _validate(layout, dims)
+
+    masks = {}
+    for fid, (w, h) in dims.items():
+        masks[fid] = {
+            "wall": np.zeros((w, h), dtype=bool),
+            "corridor": np.zeros((w, h), dtype=bool),
+            "door": np.zeros((w, h), dtype=bool),
+            "exit": np.zeros((w, h), dtype=bool),
+            "stair": np.zeros((w, h), dtype=bool),
+            "room": np.full((w, h), -1, dtype=np.int32),
+        }
+
+    for name, cells in (("wall", walls), ("corridor", corridor_cells), ("door", doors),
+                        ("exit", exits), ("stair", stairs)):
+        for fid, x, y in cells:
+            masks[fid][name][x, y] = True
+
+    rooms = []
+    for floor in layout["floors"]:
+        fid = floor["floor_id"]
+        for room in floor.get("rooms", []):
+            b = room["bounds"]
+            masks[fid]["room"][b["x"]:b["x"] + b["width"], b["y"]:b["y"] + b["height"]] = len(rooms)
+            rooms.append({"floor": fid, "id": room["id"], "index": len(rooms)})
+
+    # povezanost: svaka soba s ljudima mora imati put do izlaza
+    reach = _static_reachability(masks, exits, stairs)
+
+    room_reachable = {}
+    unreachable = []
+    for floor in layout["floors"]:
+        fid = floor["floor_id"]
+        for room in floor.get("rooms", []):
+            b = room["bounds"]
+            interior = reach[fid][b["x"] + 1:b["x"] + b["width"] - 1, b["y"] + 1:b["y"] + b["height"] - 1]
+            ok = bool(interior.any()) if interior.size else True
+            room_reachable[f"{fid}:{room['id']}"] = ok
+            if not ok and room.get("max_occupancy", 0) > 0:
+                unreachable.append(f"{room['id']} (kat {fid})")
+
+    if unreachable:
+        raise LayoutError("sobe bez puta do izlaza: " + ", ".join(unreachable))
+
+    unreachable_corridor = sum(
+        int((masks[fid]["corridor"] & ~masks[fid]["wall"] & ~reach[fid]).sum())
+        for fid in masks
+    )
+
+    report = {
+        "rooms": room_reachable,
+        "unreachable_corridor_cells": unreachable_corridor,
+        "exits": len(exits),
+        "stairs": len(stairs),
+        "walls": len(walls),
+    }
+
+    return CompiledLayout(layout, masks, rooms, report, digest)
+
+
+def save_compiled(compiled, path):
+    arrays = {
+        f"{fid}_{name}": floor_masks[name]
+        for fid, floor_masks in compiled.masks.items()
+        for name in MASK_NAMES
+    }
+    meta = {
+        "version": COMPILER_VERSION,
+        "layout": compiled.layout,
+        "rooms": compiled.rooms,
+        "report": compiled.report,
+        "floors": sorted(compiled.masks),
+    }
+    arrays["meta"] = np.frombuffer(json.dumps(meta, ensure_ascii=False).encode("utf-8"), dtype=np.uint8)
+
+    # zapis preko privremene datoteke da paralelni procesi ne čitaju pola zapisa
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez_compressed(f, **arrays)
+    os.replace(tmp_path, path)
+
+
+def load_compiled(path, digest=None):
+    with np.load(path) as data:
+        meta = json.loads(bytes(data["meta"]).decode("utf-8"))
+        if meta.get("version") != COMPILER_VERSION:
+            return None
+
+        masks = {
+            fid: {name: data[f"{fid}_{name}"] for name in MASK_NAMES}
+            for fid in meta["floors"]
+        }
+
+    return CompiledLayout(meta["layout"], masks, meta["rooms"], meta["report"], digest)
+
+
+# učitavanje layouta preko cachea po hashu sadržaja (memorija, pa disk, pa prevođenje)
+def load_layout(layout_path, cache_dir=None):
+    with open(layout_path, "rb") as f:
+        raw = f.read()
+
+    digest = hashlib.sha256(raw + f"v{COMPILER_VERSION}".encode()).hexdigest()
+
+    compiled = _memory_cache.get(digest)
+    if compiled is not None:
+        return compiled
+
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(layout_path)), ".layout_cache")
+    cache_path = os.path.join(cache_dir, f"{digest[:32]}.npz")
+
+    if os.path.exists(cache_path):
+        try:
+            compiled = load_compiled(cache_path, digest)
+        except (OSError, ValueError, KeyError):
+            compiled = None
+
+    if compiled is None:
+        layout = json.load(io.TextIOWrapper(io.BytesIO(raw), encoding="utf-8"))
+        compiled = compile_layout(layout, digest)
+
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            save_compiled(compiled, cache_path)
+        except OSError:
+            pass
+
+    _memory_cache[digest] = compiled
+    return compiled
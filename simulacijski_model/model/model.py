@@ -1,18 +1,70 @@
-import json
-import heapq
+from collections import namedtuple
+from contextlib import nullcontext
+import numpy as np
 from mesa import Model
-from mesa.space import MultiGrid
 
 try:
-    from model.agent import EvacueeAgent, WallAgent, ExitAgent, StairAgent, SmokeAgent, VentilationAgent, AlarmAgent
+    from model.agent import (
+        EvacueeAgent, AlarmAgent,
+        SMOKE_TOLERANCE_STEPS, SMOKE_DEATH_THRESHOLD, HEAT_DAMAGE_THRESHOLD, HEAT_DEATH_THRESHOLD
+    )
+    from model.population import Population, STRATEGIES, SHORTEST, LEAST_CROWDED, SAFEST, ACTIVE, DEAD
+    from model.events import EventLog
+    from model.profiler import StepProfiler
+    from model.layers import LayeredGrid, NEIGHBORS4, NEIGHBORS8, shift, neighbor_sum
+    from model.routing import ExitDistanceField, ReachabilityMap, FIELD_STRATEGIES
+    from model.layout import load_layout, validate_fire_sources
+    from model.hierarchy import RoomGraph
+    from model.recorder import TimeSeriesRecorder
+    from model import checkpoint
 except ImportError:
-    from agent import EvacueeAgent, WallAgent, ExitAgent, StairAgent, SmokeAgent, VentilationAgent, AlarmAgent
+    from agent import (
+        EvacueeAgent, AlarmAgent,
+        SMOKE_TOLERANCE_STEPS, SMOKE_DEATH_THRESHOLD, HEAT_DAMAGE_THRESHOLD, HEAT_DEATH_THRESHOLD
+    )
+    from population import Population, STRATEGIES, SHORTEST, LEAST_CROWDED, SAFEST, ACTIVE, DEAD
+    from events import EventLog
+    from profiler import StepProfiler
+    from layers import LayeredGrid, NEIGHBORS4, NEIGHBORS8, shift, neighbor_sum
+    from routing import ExitDistanceField, ReachabilityMap, FIELD_STRATEGIES
+    from layout import load_layout, validate_fire_sources
+    from hierarchy import RoomGraph
+    from recorder import TimeSeriesRecorder
+    import checkpoint
+
+
+NO_PROFILE = nullcontext()
+
+
+# stanje evakuiranog za prikaz, objavljuje se jednom po koraku
+EscapeStatus = namedtuple("EscapeStatus", ["trapped", "smoke_exposed", "panic_tier"])
+
+
+# stupanj panike: 0 mirni, 1 uznemireni, 2 u panici
+def panic_tier(panic):
+    if panic < 0.4:
+        return 0
+    if panic < 0.7:
+        return 1
+    return 2
 
 
 class EvaluationModel(Model):
 
-    def __init__(self, layout_path="podaci/building_layout.json"):
-        super().__init__()
+    def __init__(
+        self,
+        layout_path="podaci/building_layout.json",
+        seed=None,
+        smoke_spread_prob=0.15,
+        speed_range=None,
+        fire_sources=None,
+        event_log=None,
+        profile=False,
+        record_every=1,
+        synchronous=False
+    ):
+        super().__init__(seed=seed)
+        self.events = event_log if event_log is not None else EventLog()
         self.running = True
         self.steps = 0
         self.id_counter = 0
@@ -20,20 +72,21 @@ class EvaluationModel(Model):
         self.dead_count = 0
         self.evacuation_times = []
 
-        self.smoke_spread_prob = 0.15
+        # stanje svih evakuiranih u stupcima, agenti su pogledi na retke
+        self.population = Population()
+
+        self.smoke_spread_prob = smoke_spread_prob
+
+        # sinkrono: svi biraju potez iz iste snimke, sukobi se rješavaju skupno
+        self.synchronous = synchronous
         self.smoke_spread_moore = False
 
         self.room_doors = {}
 
-        self.history = {
-            "steps" : [],
-            "evacuated" : [],
-            "dead" : []
-        }
-
-        # učitavnanje layouta
-        with open(layout_path, "r") as f:
-            layout = json.load(f)
+        # učitavanje layouta, prevedene maske dolaze iz cachea ako se layout nije mijenjao
+        compiled = load_layout(layout_path)
+        layout = compiled.layout
+        self.layout_report = compiled.report
 
         floor0 = layout["floors"][0]
         self.width = floor0["dimensions"]["width"]
@@ -45,52 +98,52 @@ class EvaluationModel(Model):
         self.min_speed = speed_cfg.get("min", 0.5)
         self.max_speed = speed_cfg.get("max", 1.0)
 
+        if speed_range is not None:
+            self.min_speed, self.max_speed = speed_range
+
         self.grids = {}
         self.floors = {}
+        self.smoke_cells = set()
+        self.changed_cells = set()
 
         for floor in layout["floors"]:
             fid = floor["floor_id"]
             w = floor["dimensions"]["width"]
             h = floor["dimensions"]["height"]
-            self.grids[fid] = MultiGrid(w, h, torus=False)
+            self.grids[fid] = LayeredGrid(
+                w, h, torus=False, floor_id=fid,
+                smoke_cells=self.smoke_cells, changed_cells=self.changed_cells
+            )
             self.floors[fid] = floor
 
         self.heat = {}
 
         for fid, grid in self.grids.items():
-            self.heat[fid] = {
-                (x, y): 0.0
-                for x in range(grid.width)
-                for y in range(grid.height)
-            }
+            self.heat[fid] = np.zeros((grid.width, grid.height))
 
         self.active_floor = 0
         self.grid = self.grids[self.active_floor]
 
-        self.walls = set()
         self.exits = set()
         self.final_exits = set()
         self.exit_info = {}
         self.exit_flow_total = {}
         self.exit_flow_step = {}
-        self.exit_flow_history = {}
-        self.exit_queue_history = {}
 
-        self.corridor_cells = set()
         self.stair_links = {}
+        self.stair_sources = {}
+        self.exit_fields = {}
+        self.reach_map = None
+        self.trapped_count = 0
+        self.escape_status = {}
 
-        # vanjski zidovi
-        for fid, floor in self.floors.items():
-            w = self.grids[fid].width
-            h = self.grids[fid].height
-
-            for x in range(w):
-                self.walls.add((fid, x, 0))
-                self.walls.add((fid, x, h - 1))
-            for y in range(h):
-                self.walls.add((fid, 0, y))
-                self.walls.add((fid, w - 1, y))
+        # zidovi i hodnici iz prevedenih maski
+        self.walls = compiled.cells("wall")
+        self.corridor_cells = compiled.cells("corridor")
 
+        for fid, grid in self.grids.items():
+            grid.wall[:] = compiled.masks[fid]["wall"]
+            grid.corridor[:] = compiled.masks[fid]["corridor"]
 
         # ventilacija
         self.ventilation_cells = set()
@@ -101,25 +154,7 @@ class EvaluationModel(Model):
             y = v["y"]
 
             self.ventilation_cells.add((fid, x, y))
-            a = VentilationAgent(self.next_id(), self)
-            self.grids[fid].place_agent(a, (x, y))
-            self.agents.add(a)
-
-        for fid, floor in self.floors.items():
-            for corridor in floor.get("corridors", []):
-                path = corridor.get("path", [])
-                width = int(corridor.get("width", 1))
-                half = width // 2
-
-                for p in path:
-                    cx, cy = p["x"], p["y"]
-
-                    for dx in range(-half, half + 1):
-                        for dy in range(-half, half + 1):
-                            x, y = cx + dx, cy + dy
-                            if 0 <= x < self.grids[fid].width and 0 <= y < self.grids[fid].height:
-                                self.corridor_cells.add((fid, x, y))
-                                self.walls.discard((fid, x, y))
+            self.grids[fid].ventilation[x, y] = True
 
         self.alarms = []
 
@@ -161,7 +196,6 @@ class EvaluationModel(Model):
                 exit_key = (fid, x, y)
 
                 self.exits.add(exit_key)
-                self.walls.discard(exit_key)
 
                 if fid == 0:
                     self.final_exits.add(exit_key)
@@ -171,13 +205,12 @@ class EvaluationModel(Model):
                                             "width": width}
                 self.exit_flow_total[exit_key] = 0
                 self.exit_flow_step[exit_key] = 0
-                self.exit_flow_history[exit_key] = []
-                self.exit_queue_history[exit_key] = []
 
-                a = ExitAgent(self.next_id(), self)
-                a.floor = fid
-                self.grids[fid].place_agent(a, (x, y))
-                self.agents.add(a)
+        # vremenski nizovi po koraku, stupci izlaza istim redom kao exit_info
+        self.recorder = TimeSeriesRecorder(
+            [info["id"] for info in self.exit_info.values()],
+            every=record_every
+        )
 
         # steoenice
         for fid, floor in self.floors.items():
@@ -186,79 +219,54 @@ class EvaluationModel(Model):
                 sy = stair_data["position"]["y"]
                 target_fid = stair_data["connects_to_floor"]
 
-                stair = StairAgent(self.next_id(), self)
-                stair.floor = fid
-                stair.connects_to_floor = target_fid
-
-                self.grids[fid].place_agent(stair, (sx, sy))
-                self.agents.add(stair)
-
                 self.stair_links[(fid, sx, sy)] = target_fid
+                self.stair_sources.setdefault((target_fid, sx, sy), []).append((fid, sx, sy))
 
-                self.walls.discard((fid, sx, sy))
+        # zidovi soba kao maska; izvor požara na takvom zidu ostaje zid (vanjski zid ne)
+        self.room_walls = {}
+        fixtures = {}
 
         # prostorije
         for fid, floor in self.floors.items():
             grid = self.grids[fid]
+            masks = compiled.masks[fid]
+
+            room_walls = np.zeros_like(masks["wall"])
+            self.room_walls[fid] = room_walls
+
+            # ćelije s izlazom, stepenicama, ventilacijom ili alarmom ne dobivaju zid sobe ni ljude
+            occupied = masks["exit"] | masks["stair"] | grid.ventilation
+            for alarm in self.alarms:
+                if alarm.floor == fid:
+                    occupied[alarm.position] = True
+            fixtures[fid] = occupied
 
             for room in floor.get("rooms", []):
                 b = room["bounds"]
+                x0, y0 = b["x"], b["y"]
+                x1, y1 = x0 + b["width"], y0 + b["height"]
 
                 # zidovi od prostorije
-                for x in range(b["x"], b["x"] + b["width"]):
-                    for y in range(b["y"], b["y"] + b["height"]):
-                        is_edge = (
-                            x == b["x"]
-                            or x == b["x"] + b["width"] - 1
-                            or y == b["y"]
-                            or y == b["y"] + b["height"] - 1
-                        )
-                        if is_edge and (fid, x, y) not in self.corridor_cells:
-                            self.walls.add((fid, x, y))
-
-               # vrata
-                for door in room.get("doors", []):
-                    dx, dy = door["x"], door["y"]
-                    self.walls.discard((fid, dx, dy))
-
-                for x in range(b["x"], b["x"] + b["width"]):
-                    for y in range(b["y"], b["y"] + b["height"]):
-                        if (fid, x, y) in self.walls and (fid, x, y) not in self.exits:
-                            if grid.is_cell_empty((x, y)):
-                                w_agent = WallAgent(self.next_id(), self)
-                                w_agent.floor = fid
-                                grid.place_agent(w_agent, (x, y))
-                                self.agents.add(w_agent)
-
-                # postavi osobe u prostorije
+                room_walls[x0:x1, y0:y1] |= masks["wall"][x0:x1, y0:y1] & ~occupied[x0:x1, y0:y1]
+
+                # postavi osobe u prostorije, slučajni odabir između slobodnih ćelija unutrašnjosti
                 max_occ = room.get("max_occupancy", 0)
-                placed = 0
-                attempts = 0
-
-                while placed < max_occ and attempts < 500:
-                    if b["width"] <= 2 or b["height"] <= 2:
-                        break
-
-                    rx = self.random.randint(b["x"] + 1, b["x"] + b["width"] - 2)
-                    ry = self.random.randint(b["y"] + 1, b["y"] + b["height"] - 2)
-                    pos = (rx, ry)
-
-                    # izbjegni zidove
-                    if (fid, rx, ry) in self.walls or (fid, rx, ry) in self.exits:
-                        attempts += 1
-                        continue
-
-                    # provjeri da u ćelijama nema drugih ljudi i da nema dima
-                    if grid.is_cell_empty(pos) and not any(
-                        isinstance(a, SmokeAgent) for a in grid.get_cell_list_contents(pos)
-                    ):
-                        e = EvacueeAgent(self.next_id(), self)
-                        e.floor = fid
-                        grid.place_agent(e, pos)
-                        self.agents.add(e)
-                        placed += 1
-
-                    attempts += 1
+                if max_occ <= 0 or b["width"] <= 2 or b["height"] <= 2:
+                    continue
+
+                free = [
+                    (x, y)
+                    for x in range(x0 + 1, x1 - 1)
+                    for y in range(y0 + 1, y1 - 1)
+                    if not masks["wall"][x, y] and not occupied[x, y]
+                    and grid.is_cell_empty((x, y)) and not self.has_smoke(fid, (x, y))
+                ]
+
+                for pos in self.random.sample(free, min(max_occ, len(free))):
+                    e = EvacueeAgent(self.next_id(), self)
+                    e.floor = fid
+                    grid.place_agent(e, pos)
+                    self.agents.add(e)
 
         corridor_spawn_ratio = 0.25
 
@@ -269,45 +277,42 @@ class EvaluationModel(Model):
         )
 
         corridor_people = int(total_people * corridor_spawn_ratio)
-        corridor_cells = list(self.corridor_cells)
-
-        placed = 0
-        attempts = 0
-
-        while placed < corridor_people and attempts < 3000 and corridor_cells:
-            fid, x, y = self.random.choice(corridor_cells)
+        corridor_cells = [
+            (fid, x, y)
+            for fid, x, y in compiled.ordered_cells("corridor")
+            if self.passable(fid, (x, y))
+            and not fixtures[fid][x, y]
+            and self.grids[fid].is_cell_empty((x, y))
+            and not self.has_smoke(fid, (x, y))
+        ]
 
-            if not self.passable(fid, (x, y)):
-                attempts += 1
-                continue
+        for fid, x, y in self.random.sample(corridor_cells, min(corridor_people, len(corridor_cells))):
+            e = EvacueeAgent(self.next_id(), self)
+            e.floor = fid
+            self.grids[fid].place_agent(e, (x, y))
+            self.agents.add(e)
 
-            grid = self.grids[fid]
+        # pozar (kopija, prevedeni layout dijele svi modeli iz cachea)
+        hazards = dict(layout.get("hazards", {}))
 
-            if grid.is_cell_empty((x, y)) and not any(
-                isinstance(a, SmokeAgent) for a in grid.get_cell_list_contents((x, y))
-            ):
-                e = EvacueeAgent(self.next_id(), self)
-                e.floor = fid
-                grid.place_agent(e, (x, y))
-                self.agents.add(e)
-                placed += 1
+        # izvori požara mogu se zadati izvana kao (kat, x, y)
+        if fire_sources is not None:
+            validate_fire_sources(compiled, fire_sources)
+            hazards["fire_sources"] = [
+                {"floor": f, "position": {"x": x, "y": y}}
+                for f, x, y in fire_sources
+            ]
 
-            attempts += 1
-
-        # pozar
-        hazards = layout.get("hazards", {})
         for source in hazards.get("fire_sources", []):
             sfid = source["floor"]
             sx = source["position"]["x"]
             sy = source["position"]["y"]
 
-            first_smoke = SmokeAgent(self.next_id(), self)
-            first_smoke.floor = sfid
-            self.grids[sfid].place_agent(first_smoke, (sx, sy))
-            self.agents.add(first_smoke)
+            self.grids[sfid].add_smoke((sx, sy))
 
             # prikazi pozar u polaznoj celiji kak je u JSONu definirano
             self.walls.discard((sfid, sx, sy))
+            self.grids[sfid].wall[sx, sy] = self.room_walls[sfid][sx, sy]
 
         self.random_cfg = hazards.get("random_fire_sources", {})
         self.random_fire_triggered = False
@@ -322,20 +327,49 @@ class EvaluationModel(Model):
                 )
                 grid = self.grids[fid]
 
-                while True:
-                    x = self.random.randrange(grid.width)
-                    y = self.random.randrange(grid.height)
-                    if self.passable(fid, (x, y)):
-                        break
+                # prolazne ćelije istim uvjetom kao passable, bez slučajnog pogađanja
+                open_cells = np.argwhere(~grid.wall & (grid.smoke == 0) & (grid.evacuees < 3))
+                if not len(open_cells):
+                    continue
+                x, y = (int(v) for v in open_cells[self.random.randrange(len(open_cells))])
+
+                grid.add_smoke((x, y))
 
-                smoke = SmokeAgent(self.next_id(), self)
-                smoke.floor = fid
+        # sobe sažete na vrata za polja udaljenosti i osobne planove, zidovi su sad konačni
+        self.room_graph = RoomGraph(self, compiled.masks)
 
-                grid.place_agent(smoke, (x,y))
-                self.agents.add(smoke)
+        # numpy generator za širenje dima, sjeme dolazi iz self.random
+        self.smoke_rng = np.random.default_rng(self.random.getrandbits(64))
+
+        # zaseban generator za skupne odluke ljudi (brzina, nasumična strategija)
+        self.move_rng = np.random.default_rng(self.random.getrandbits(64))
+
+        # izlazi po katu kao maska i udaljenost (Manhattan) do najbližeg izlaza na istom katu;
+        # namjerno ne polje izlaza: zidove i stepenice ne gleda, kao i izvorno pravilo zapinjanja i smirivanja panike
+        self.exit_mask = {fid: compiled.masks[fid]["exit"] for fid in self.grids}
+        self.exit_distance = {}
+        for fid, grid in self.grids.items():
+            xs, ys = np.indices((grid.width, grid.height))
+            dist = np.full((grid.width, grid.height), np.nan)
+            for f, ex, ey in self.exits:
+                if f == fid:
+                    dist = np.fmin(dist, np.abs(xs - ex) + np.abs(ys - ey))
+            self.exit_distance[fid] = dist
+
+        # ciljni kat stepenica po ćeliji (-1 bez stepenica) i pomak kata u ravnom indeksu ćelija
+        self.stair_target = {fid: np.full((g.width, g.height), -1, dtype=np.int16) for fid, g in self.grids.items()}
+        for (fid, x, y), target in self.stair_links.items():
+            self.stair_target[fid][x, y] = target
+
+        self.cell_offset = {}
+        offset = 0
+        for fid in sorted(self.grids):
+            self.cell_offset[fid] = offset
+            offset += self.grids[fid].width * self.grids[fid].height
+        self.cell_count = offset
 
         self.reset_agent_knowledge()
-        print("Model inicijaliziran")
+        self.publish_escape_status()
         ground_exits = 0
         upper_exits = 0
 
@@ -345,15 +379,54 @@ class EvaluationModel(Model):
             else:
                 upper_exits += 1
 
-        print(f"Izlaz prizemlje : {ground_exits}")
-        print(f"Izlaz 1. kat: {upper_exits}")
+        self.log_event("initialized", ground_exits=ground_exits, upper_exits=upper_exits)
+
+        # mjerenje faza koraka samo na zahtjev
+        self.profiler = None
+        if profile:
+            self.set_profiling(True)
+
+    # uključi ili isključi profiler između koraka; bez profilera metode nemaju omotače
+    def set_profiling(self, enabled, keep_rows=True):
+        if enabled and self.profiler is None:
+            self.profiler = StepProfiler(keep_rows=keep_rows)
+            self.profiler.attach(self)
+        elif not enabled and self.profiler is not None:
+            self.profiler.detach(self)
+            self.profiler = None
+
+    # spremi stanje u datoteku ili, bez putanje, vrati bajtove
+    def checkpoint(self, path=None):
+        if path is None:
+            return checkpoint.dumps(self)
+        checkpoint.save(self, path)
+
+    # model iz checkpointa (putanja ili bajtovi), događaji i profiler se zadaju iznova;
+    # checkpoint je pickle i izvršava kod pri učitavanju, pa samo iz pouzdanog izvora
+    @staticmethod
+    def restore(source, event_log=None, profile=False):
+        if isinstance(source, (bytes, bytearray)):
+            return checkpoint.loads(source, event_log, profile)
+        return checkpoint.load(source, event_log, profile)
+
+    # neovisna kopija trenutnog stanja za "što ako" grane
+    def fork(self, event_log=None, profile=False):
+        return checkpoint.fork(self, event_log, profile)
+
+    def phase(self, name):
+        if self.profiler is None:
+            return NO_PROFILE
+        return self.profiler.phase(name)
+
+    # događaji idu u event log umjesto na stdout
+    def log_event(self, kind, **data):
+        self.events.emit(kind, self.steps, **data)
 
     def reset_agent_knowledge(self):
-        for a in self.agents:
-            if isinstance(a, EvacueeAgent):
-                a.blocked_cells.clear()
-                a.visible_cells.clear()
-                a.alarm_heard = False
+        for a in self.population.agents:
+            a.blocked_cells.clear()
+            a.visible_window = None
+        self.population.alarm_heard[:] = False
 
     # ovo svaki agent ima svoj ID
     def next_id(self):
@@ -373,32 +446,24 @@ class EvaluationModel(Model):
         if not self.in_bounds(floor_id, pos):
             return False
 
-        if (floor_id, x, y) in self.walls:
-            return False
+        grid = self.grids[floor_id]
 
-        if self.has_smoke(floor_id, pos):
+        # ako je zid ili požar blokiraj prolaznost
+        if grid.wall[x, y] or grid.smoke[x, y]:
             return False
 
         if agent is not None and hasattr(agent, "blocked_cells"):
             if (floor_id, x, y) in agent.blocked_cells:
                 return False
 
-        cell_contents = self.grids[floor_id].get_cell_list_contents(pos)
-        for a in cell_contents:
-            # ako je zid ili požar blokiraj prolaznost
-            if isinstance(a, WallAgent):
-                return False
-
-        evacuees = sum(isinstance(a, EvacueeAgent) for a in cell_contents)
-        if evacuees >= 3:
-            #print(f"puna celija {floor_id, pos}: {evacuees} ljudi")
+        if grid.evacuees[x, y] >= 3:
+            #print(f"puna celija {floor_id, pos}: {grid.evacuees[x, y]} ljudi")
             return False
 
         return True
 
     def has_smoke(self, floor_id, pos):
-        cell = self.grids[floor_id].get_cell_list_contents(pos)
-        return any(isinstance(a, SmokeAgent) for a in cell)
+        return self.grids[floor_id].smoke[pos] > 0
 
     # gleda 4 susjedna polja
     def neighbors4(self, floor_id, pos, agent=None):
@@ -406,9 +471,10 @@ class EvaluationModel(Model):
         cand = [(x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)]
         passable_cand = [p for p in cand if self.passable(floor_id, p, agent)]
 
+        corridor = self.grids[floor_id].corridor
         return sorted(
             passable_cand,
-            key=lambda p: (floor_id, p[0], p[1]) not in self.corridor_cells
+            key=lambda p: not corridor[p]
         )
 
 
@@ -434,70 +500,51 @@ class EvaluationModel(Model):
 
     # širenje požara
     def spread_smoke(self):
-        smoke_agents = [a for a in self.agents if isinstance(a, SmokeAgent)]
-
         MAX_HEAT = 25.0  # max toplina
 
-        for s in smoke_agents:
-            fid = s.floor
-            x, y = s.pos
-
-            # centar požara
-            self.heat[fid][(x, y)] = min(MAX_HEAT, self.heat[fid][(x, y)] + 2.0)
+        offsets = NEIGHBORS8 if self.smoke_spread_moore else NEIGHBORS4
 
-            for nx, ny in self.neighbors4(fid, (x, y)):
-                self.heat[fid][(nx, ny)] = min(MAX_HEAT, self.heat[fid][(nx, ny)] + 0.5)
-
-        for s in list(smoke_agents):
-            fid = s.floor
-            x, y = s.pos
-            key = (fid, x, y)
-            if key in self.ventilation_cells:
-                self.grids[s.floor].remove_agent(s)
-                self.agents.remove(s)
-                self.heat[fid][(x, y)] = 0.0
-
-        smoke_agents = [a for a in self.agents if isinstance(a, SmokeAgent)]
-
-        self.random.shuffle(smoke_agents)
-
-        for s in smoke_agents:
-            sfid = s.floor
-            pos = s.pos
-
-            neighbors = self.grids[sfid].get_neighborhood(
-                pos,
-                moore=self.smoke_spread_moore,
-                include_center=False
+        for fid, grid in self.grids.items():
+            heat = self.heat[fid]
+
+            # centar požara i prolazni susjedi
+            heat += 2.0 * grid.smoke
+            heat += 0.5 * grid.open_mask() * neighbor_sum(grid.smoke)
+            np.minimum(heat, MAX_HEAT, out=heat)
+
+            # ventilacija uklanja dim
+            vented = (grid.smoke > 0) & grid.ventilation
+            for x, y in zip(*np.nonzero(vented)):
+                grid.clear_smoke((int(x), int(y)))
+            heat[vented] = 0.0
+
+            # svaki izvor dima pokušava zasebno za svakog susjeda
+            sources = grid.smoke > 0
+            source_prob = np.where(
+                sources,
+                self.smoke_spread_prob + np.minimum(0.3, heat * 0.02),
+                0.0
             )
+            target_factor = np.where(grid.ventilation, 0.15, 1.0)
 
-            for nb in neighbors:
-                if self.passable(sfid, nb) and not any(
-                    isinstance(a, SmokeAgent)
-                    for a in self.grids[sfid].get_cell_list_contents(nb)
-                ):
-                    cell_heat = self.heat[sfid][pos]
-                    spread_prob = self.smoke_spread_prob + min(0.3, cell_heat * 0.02)
+            new_smoke = np.zeros(sources.shape, dtype=bool)
+            for dx, dy in offsets:
+                spread_prob = shift(source_prob, dx, dy) * target_factor
+                draws = self.smoke_rng.random(spread_prob.shape)
+                new_smoke |= draws < spread_prob
 
-                    if (sfid, nb[0], nb[1]) in self.ventilation_cells:
-                        spread_prob *= 0.15
+            new_smoke &= grid.open_mask()
 
-                    if self.random.random() < spread_prob:
-                        new_smoke = SmokeAgent(self.next_id(), self)
-                        new_smoke.floor = sfid
-                        self.grids[sfid].place_agent(new_smoke, nb)
-                        self.agents.add(new_smoke)
+            for x, y in zip(*np.nonzero(new_smoke)):
+                grid.add_smoke((int(x), int(y)))
 
-        for fid in self.heat:
-            for pos in self.heat[fid]:
-                self.heat[fid][pos] = max(0.0, self.heat[fid][pos] - 0.1)
+        for heat in self.heat.values():
+            np.maximum(heat - 0.1, 0.0, out=heat)
 
 
     def get_cost(self, floor, pos, agent=None):
-        cell = self.grids[floor].get_cell_list_contents(pos)
-
         # zid = neprolazno
-        if any(isinstance(a, WallAgent) for a in cell):
+        if self.grids[floor].wall[pos]:
             return 1000
 
         # agent zna da je nešto opasno npr dpbio poruku ili vidio dim
@@ -505,18 +552,23 @@ class EvaluationModel(Model):
             if(floor, pos[0], pos[1]) in agent.blocked_cells:
                 return 1000
 
-        if (floor, pos[0], pos[1]) in self.corridor_cells:
+        strategy = agent.strategy if agent is not None else None
+        return self.strategy_cost(floor, pos, strategy)
+
+    # cijena ulaska u ćeliju za strategiju, bez osobnog znanja agenta
+    def strategy_cost(self, floor, pos, strategy=None):
+        if self.grids[floor].corridor[pos]:
             base_cost = 0.6
         else:
             base_cost = 1.0
 
         # strategije
-        if agent is None or agent.strategy == "shortest":
+        if strategy is None or strategy == "shortest":
             if self.has_smoke(floor, pos):
                 return base_cost + 5
             return base_cost
 
-        if agent.strategy == "safest":
+        if strategy == "safest":
             smoke_penalty = 0
 
             if self.has_smoke(floor, pos):
@@ -528,186 +580,492 @@ class EvaluationModel(Model):
 
             return base_cost + smoke_penalty
 
-        if agent.strategy == "least_crowded":
-            density = len([
-                a for a in self.grids[floor].get_cell_list_contents(pos)
-                if isinstance(a, EvacueeAgent)
-            ])
+        if strategy == "least_crowded":
+            density = self.grids[floor].evacuees[pos]
             return base_cost + density * 3
 
         return base_cost
 
-    # dijkstrin algoritam
-    def dijkstra_next_step(self, floor_id, start_pos, agent=None):
-        sx, sy = start_pos
+    # isto što strategy_cost, ali za cijeli kat odjednom
+    def cost_layer(self, floor, strategy=None):
+        grid = self.grids[floor]
+        base_cost = np.where(grid.corridor, 0.6, 1.0)
+        smoky = grid.smoke > 0
 
-        if (floor_id, sx, sy) in self.final_exits:
-            return (floor_id, start_pos)
+        if strategy is None or strategy == "shortest":
+            return base_cost + 5 * smoky
 
-        start_state = (floor_id, sx, sy)
+        # susjedi iz neighbors4 su prolazni, dakle bez dima, pa ostaje kazna za samu ćeliju
+        if strategy == "safest":
+            return base_cost + 10 * smoky
 
-        pq = [(0, start_state)]
-        dist = {start_state: 0}
-        prev = {start_state: None}
-        visited = set()
+        if strategy == "least_crowded":
+            return base_cost + 3 * grid.evacuees
 
-        while pq:
-            curr_dist, current_state = heapq.heappop(pq)
-            cfid, cx, cy = current_state
+        return base_cost
 
-            if current_state in visited:
-                continue
-            visited.add(current_state)
+    # cijena prelaska stepenicama na ciljni kat
+    def stair_cost(self, target_floor, pos):
+        cost = 0.5
+
+        if self.has_smoke(target_floor, pos):
+            cost += 4
+
+        target_heat = self.heat[target_floor][pos]
+        if target_heat > 5:
+            cost += target_heat * 1.5
+
+        return cost
+
+    # ćelije s promjenom dima, ljudi ili zidova od zadnjeg poziva
+    def take_changed_cells(self):
+        changed = set(self.changed_cells)
+        self.changed_cells.clear()
+        return changed
+
+    # zajednička polja udaljenosti do izlaza, jedno po strategiji, popravljaju se samo oko promjena
+    def update_exit_fields(self):
+        self.room_graph.mark_changed(self.take_changed_cells())
+        self.exit_fields = {}
+        for strategy in FIELD_STRATEGIES:
+            self.exit_field(strategy)
+
+    def exit_field(self, strategy):
+        field = self.exit_fields.get(strategy)
+        if field is None:
+            field = ExitDistanceField(self, strategy).compute()
+            self.exit_fields[strategy] = field
+        return field
+
+    # sljedeći korak iz zajedničkog polja; agentovo znanje o dimu je uvijek podskup dima modela
+    def field_next_step(self, floor_id, pos, agent=None):
+        x, y = pos
 
-            if current_state in self.exits:
-                step = current_state
-                while prev[step] is not None and prev[step] != start_state:
-                    step = prev[step]
-                return (step[0], (step[1], step[2]))
+        if (floor_id, x, y) in self.exits:
+            return (floor_id, pos)
 
-            for nb in self.neighbors4(cfid, (cx, cy), agent):
-                nx, ny = nb
-                nb_state = (cfid, nx, ny)
-                new_dist = curr_dist + self.get_cost(cfid, (nx, ny), agent)
+        strategy = agent.strategy if agent is not None else None
+        field = self.exit_field(strategy or "shortest")
 
-                if nb_state not in dist or new_dist < dist[nb_state]:
-                    dist[nb_state] = new_dist
-                    prev[nb_state] = (cfid, cx, cy)
-                    heapq.heappush(pq, (new_dist, nb_state))
+        best = None
+        best_dist = None
 
-            if (cfid, cx, cy) in self.exits:
-                penalty = 0
-                if (cfid, cx, cy) not in self.final_exits:
-                    penalty = 15   # emergency izlaz je lošiji
+        for nb in self.neighbors4(floor_id, pos, agent):
+            d = field.get((floor_id, nb[0], nb[1]))
+            if d is None:
+                continue
 
-                exit_state = (cfid, cx, cy)
-                new_dist = curr_dist + penalty
+            d += self.get_cost(floor_id, nb, agent)
+            if best_dist is None or d < best_dist:
+                best_dist = d
+                best = (floor_id, nb)
+
+        # stepenice
+        key = (floor_id, x, y)
+        if key in self.stair_links:
+            tfid = self.stair_links[key]
+
+            if self.passable(tfid, pos, agent):
+                d = field.standing((tfid, x, y))
+                if d is not None:
+                    d += self.stair_cost(tfid, pos)
+                    if best_dist is None or d < best_dist:
+                        best_dist = d
+                        best = (tfid, pos)
+
+        return best
+
+    # mapa dostupnosti izlaza za trenutno stanje, računa se jednom po koraku
+    def update_reachability(self):
+        self.reach_map = ReachabilityMap(self).compute()
+        return self.reach_map
+
+    def reachability(self):
+        if self.reach_map is None:
+            return self.update_reachability()
+        return self.reach_map
+
+    def escape_status_of(self, evacuee):
+        return EscapeStatus(
+            trapped=not self.can_escape(evacuee),
+            smoke_exposed=bool(self.has_smoke(evacuee.floor, evacuee.pos)),
+            panic_tier=panic_tier(evacuee.panic)
+        )
 
-                if exit_state not in dist or new_dist < dist[exit_state]:
-                    dist[exit_state] = new_dist
-                    prev[exit_state] = current_state
-                    heapq.heappush(pq, (new_dist, exit_state))
+    # snimka stanja svih evakuiranih, prikaz katova je samo čita
+    def publish_escape_status(self, evacuees=None):
+        if evacuees is None:
+            evacuees = [self.population.agents[i] for i in self.population.active()]
 
-            # stepenice
-            key = (cfid, cx, cy)
-            if key in self.stair_links:
-                tfid = self.stair_links[key]
+        self.escape_status = {
+            a.unique_id: self.escape_status_of(a)
+            for a in evacuees
+        }
+        return self.escape_status
 
-                if self.in_bounds(tfid, (cx, cy)) and (tfid, cx, cy) not in self.walls:
-                    nb_state = (tfid, cx, cy)
+    # ima ikakav put do izlaza
+    def can_escape(self, evacuee):
+        fid = getattr(evacuee, "floor", 0)
+        return self.reachability().can_reach(fid, evacuee.pos, evacuee)
 
-                    stair_cost = 0.5
+    # aktivni alarm: svi koji ga još nisu čuli u pokrivenosti dobiju +0.2 panike
+    def broadcast_alarms(self):
+        pop = self.population
+        idx = None
 
-                    if self.has_smoke(tfid, (cx, cy)):
-                        stair_cost += 4
+        for alarm in self.alarms:
+            if not alarm.active:
+                continue
 
-                    target_heat = self.heat[tfid].get((cx, cy), 0)
-                    if target_heat > 5:
-                        stair_cost += target_heat * 1.5
+            if idx is None:
+                idx = pop.active()
+            here = idx[(pop.floor[idx] == alarm.floor) & ~pop.alarm_heard[idx]]
+            heard = here[alarm.covers(pop.x[here], pop.y[here])]
 
-                    stair_dist = curr_dist + stair_cost
+            pop.alarm_heard[heard] = True
+            pop.panic[heard] = np.minimum(1.0, pop.panic[heard] + 0.2)
 
-                    if nb_state not in dist or stair_dist < dist[nb_state]:
-                        dist[nb_state] = stair_dist
-                        prev[nb_state] = (cfid, cx, cy)
-                        heapq.heappush(pq, (stair_dist, nb_state))
+    # korak svih evakuiranih: percepcija po agentu, skupno stanje, pa pomak onih koji se miču
+    def step_evacuees(self):
+        pop = self.population
 
-        return None
+        with self.phase("evacuees:perceive"):
+            for i in pop.active():
+                pop.agents[i].perceive_environment()
 
-    # manhattan udaljenost do najblizeg izlaza na istom katu
-    def distance_to_nearest_exit(self, floor, pos):
-        exits_on_floor = [
-            (x, y) for (f, x, y) in self.exits if f == floor
-        ]
+        with self.phase("evacuees:state"):
+            movers = self.update_population()
 
-        if not exits_on_floor:
-            return None
+        if not self.synchronous:
+            with self.phase("evacuees:move"):
+                for i in movers:
+                    pop.agents[i].move()
+            return
 
-        x, y = pos
-        return min(abs(x - ex) + abs(y - ey) for ex, ey in exits_on_floor)
+        with self.phase("evacuees:decide"):
+            target = self.decide_moves(movers)
+
+        with self.phase("evacuees:resolve"):
+            self.resolve_moves(movers, target)
+
+    # ravni indeks ćelije (kat, x, y) preko svih katova
+    def cell_keys(self, floors, xs, ys):
+        keys = np.empty(len(floors), dtype=np.int64)
+        for fid, offset in self.cell_offset.items():
+            on_floor = floors == fid
+            keys[on_floor] = offset + xs[on_floor] * self.grids[fid].height + ys[on_floor]
+        return keys
+
+    # ciljevi iz snimke: (kat, x, y) po agentu, -1 kad agent ostaje
+    def decide_moves(self, movers):
+        pop = self.population
+        target = self.field_moves(movers)
+
+        # korak na stepenice je prelazak na drugi kat, ako je ciljna ćelija tamo prolazna
+        for k in np.nonzero(target[:, 0] >= 0)[0]:
+            agent = pop.agents[movers[k]]
+            _, nx, ny = (int(v) for v in target[k])
+            tfid = self.stair_target[agent.floor][nx, ny]
+            if tfid < 0:
+                target[k, 0] = agent.floor
+            elif self.passable(int(tfid), (nx, ny), agent):
+                target[k, 0] = tfid
+            else:
+                target[k] = -1
 
-    # ima ikakav put do izlaza
-    def can_escape(self, evacuee):
-        fid = getattr(evacuee, "floor", 0)
-        res = self.dijkstra_next_step(fid, evacuee.pos, evacuee)
-        return res is not None
+        return target
 
-    #  koraci
-    def step(self):
-        self.reset_exit_step_capacity()
-        if not self.running:
-            return
+    # field_next_step za sve agente odjednom, isti redoslijed izbora među jednakima
+    def field_moves(self, idx):
+        pop = self.population
+        out = np.full((len(idx), 3), -1, dtype=np.int64)
+        if not len(idx):
+            return out
 
-        self.spread_smoke()
+        fields = {fid: np.stack([self.exit_field(name).dist[fid] for name in STRATEGIES]) for fid in self.grids}
+        floors = pop.floor[idx]
+        strategy = pop.strategy[idx]
 
-        for alarm in self.alarms:
-                if not alarm.active:
+        for fid, grid in self.grids.items():
+            sel = np.nonzero(floors == fid)[0]
+            if not len(sel):
+                continue
+
+            x = pop.x[idx[sel]]
+            y = pop.y[idx[sel]]
+            code = strategy[sel]
+            cost = np.stack([self.cost_layer(fid, name) for name in STRATEGIES])
+            open_cells = grid.open_mask()
+
+            best = np.full(len(sel), np.inf)
+            best_rank = np.full(len(sel), len(NEIGHBORS4) * 2)
+            best_x = np.full(len(sel), -1)
+            best_y = np.full(len(sel), -1)
+
+            # neighbors4 slaže hodnike prvo, pa izvorni redoslijed; strogo manje zadržava prvog
+            for k, (dx, dy) in enumerate(NEIGHBORS4):
+                nx, ny = x + dx, y + dy
+                inside = (nx >= 0) & (nx < grid.width) & (ny >= 0) & (ny < grid.height)
+                cx, cy = np.where(inside, nx, 0), np.where(inside, ny, 0)
+
+                d = fields[fid][code, cx, cy] + cost[code, cx, cy]
+                d = np.where(inside & open_cells[cx, cy], d, np.inf)
+                rank = np.where(grid.corridor[cx, cy], 0, len(NEIGHBORS4)) + k
+
+                better = np.isfinite(d) & ((d < best) | ((d == best) & (rank < best_rank)))
+                best = np.where(better, d, best)
+                best_rank = np.where(better, rank, best_rank)
+                best_x = np.where(better, nx, best_x)
+                best_y = np.where(better, ny, best_y)
+
+            found = np.isfinite(best)
+            out[sel[found]] = np.column_stack([np.full(found.sum(), fid), best_x[found], best_y[found]])
+
+            # stepenice pod agentom
+            for j in np.nonzero(self.stair_target[fid][x, y] >= 0)[0]:
+                pos = (int(x[j]), int(y[j]))
+                tfid = int(self.stair_target[fid][pos])
+                if not self.passable(tfid, pos):
                     continue
+                d = self.exit_field(STRATEGIES[code[j]]).standing((tfid, *pos))
+                if d is not None and d + self.stair_cost(tfid, pos) < best[j]:
+                    out[sel[j]] = (tfid, *pos)
+
+        return out
+
+    # skupno rješavanje sukoba: najviše 3 po ćeliji, prednost po ždrijebu, odbijeni ostaju na mjestu
+    def resolve_moves(self, movers, target):
+        pop = self.population
+        moving = target[:, 0] >= 0
+        movers = movers[moving]
+        target = target[moving]
+        if not len(movers):
+            return
 
-                grid = self.grids[alarm.floor]
-                neighbors = grid.get_neighborhood(
-                    alarm.position,
-                    moore=True,
-                    radius=alarm.radius,
-                    include_center=True
-                )
+        idx = pop.active()
+        origin = self.cell_keys(pop.floor[idx], pop.x[idx], pop.y[idx])
+        final = origin.copy()
+
+        slot = np.searchsorted(idx, movers)
+        incoming = np.zeros(len(idx), dtype=bool)
+        incoming[slot] = True
+        final[slot] = self.cell_keys(target[:, 0], target[:, 1], target[:, 2])
+
+        priority = np.zeros(len(idx))
+        priority[slot] = self.move_rng.random(len(movers))
+
+        while True:
+            counts = np.bincount(final, minlength=self.cell_count)
+            over = incoming & (counts[final] > 3)
+            if not over.any():
+                break
+
+            # u prepunoj ćeliji ostaju dolasci s najvećim ždrijebom koliko stane uz one koji ne idu
+            cand = np.nonzero(over)[0]
+            order = cand[np.lexsort((-priority[cand], final[cand]))]
+            cells = final[order]
+            first = np.searchsorted(cells, cells)
+            rank = np.arange(len(order)) - first
+
+            arriving = np.bincount(final[incoming], minlength=self.cell_count)
+            room = 3 - (counts[cells] - arriving[cells])
+
+            rejected = order[rank >= room]
+            incoming[rejected] = False
+            final[rejected] = origin[rejected]
+
+        for k in np.nonzero(incoming[slot])[0]:
+            agent = pop.agents[movers[k]]
+            tfid, nx, ny = (int(v) for v in target[k])
+
+            if tfid != agent.floor:
+                self.grids[agent.floor].remove_agent(agent)
+                agent.floor = tfid
+                self.grids[tfid].place_agent(agent, (nx, ny))
+                agent.panic = min(1.0, agent.panic + 0.05)
+            else:
+                self.grids[tfid].move_agent(agent, (nx, ny))
+
+    # pravila panike, štete od dima i topline, izlaza i strategije nad svim aktivnim agentima odjednom
+    def update_population(self):
+        pop = self.population
+        idx = pop.active()
+        if not len(idx):
+            return idx
+
+        panic = pop.panic[idx]
+
+        # alarm i opći porast panike
+        panic = np.where(pop.alarm_heard[idx], np.minimum(1.0, panic + 0.05), panic)
+        panic = np.minimum(1.0, panic + 0.02)
+
+        smoke_near = {fid: neighbor_sum(grid.smoke > 0, NEIGHBORS8) > 0 for fid, grid in self.grids.items()}
+        panic = np.where(pop.gather(smoke_near, idx), np.minimum(1.0, panic + 0.05), panic)
+
+        # napredak prema izlazu: udaljenost veća nego prošli put = zapeo
+        dist = pop.gather(self.exit_distance, idx, fill=np.nan)
+        last = pop.last_exit_dist[idx]
+        known = ~np.isnan(dist) & ~np.isnan(last)
+        stuck = pop.stuck_steps[idx]
+        stuck = np.where(known, np.where(dist > last, stuck + 1, 0), stuck)
+        pop.last_exit_dist[idx] = dist
+
+        panic = np.where(dist <= 3, np.minimum(panic, 0.4), panic)
+
+        # šteta od dima i topline
+        heat = pop.gather(self.heat, idx)
+        smoke = pop.gather({fid: grid.smoke for fid, grid in self.grids.items()}, idx) > 0
+        exposed = smoke | (heat > HEAT_DAMAGE_THRESHOLD)
+
+        smoke_steps = pop.smoke_steps[idx]
+        smoke_steps = np.where(
+            exposed,
+            smoke_steps + 1.0 + np.maximum(0, (heat - HEAT_DAMAGE_THRESHOLD) / 10.0),
+            np.maximum(0, smoke_steps - 0.5)
+        )
 
-                for pos in neighbors:
-                    for agent in grid.get_cell_list_contents(pos):
-                        if isinstance(agent, EvacueeAgent) and not agent.alarm_heard:
-                            agent.alarm_heard = True
-                            agent.panic = min(1.0, agent.panic + 0.2)
-        self.steps += 1
-        self.agents.do("step")
-
-        self.dead_count = sum(
-            1 for a in self.agents
-            if isinstance(a, EvacueeAgent) and getattr(a, "dead", False)
+        heat_death = exposed & (heat >= HEAT_DEATH_THRESHOLD)
+        smoke_death = exposed & ~heat_death & (smoke_steps >= SMOKE_DEATH_THRESHOLD)
+        alive = ~(heat_death | smoke_death)
+
+        smoke_panic = np.where(
+            smoke_steps > SMOKE_TOLERANCE_STEPS,
+            0.08 + (smoke_steps - SMOKE_TOLERANCE_STEPS) * 0.02,
+            0.05
         )
+        panic = np.where(exposed & alive, np.minimum(1.0, panic + smoke_panic), panic)
 
-        current_evacuees = [
-            a for a in self.agents
-            if isinstance(a, EvacueeAgent)
-            and not getattr(a, "dead", False)
-            and not getattr(a, "evacuated", False)
-        ]
+        pop.panic[idx] = panic
+        pop.smoke_steps[idx] = smoke_steps
+        pop.stuck_steps[idx] = stuck
 
-        can_anyone_escape = any(self.can_escape(a) for a in current_evacuees)
+        for k in np.nonzero(~alive)[0]:
+            agent = pop.agents[idx[k]]
+            if heat_death[k]:
+                agent.die("heat", heat=float(heat[k]))
+            else:
+                agent.die("smoke", smoke_steps=float(smoke_steps[k]))
+
+        # evakuacija redom agenata, kapacitet izlaza se troši tim redom (sinkrono: ždrijeb)
+        on_exit = alive & pop.gather(self.exit_mask, idx)
+        claimants = idx[on_exit]
+        if self.synchronous:
+            claimants = claimants[np.argsort(self.move_rng.random(len(claimants)), kind="stable")]
+
+        for i in claimants:
+            exit_key = (int(pop.floor[i]), int(pop.x[i]), int(pop.y[i]))
+            if self.request_exit_pass(exit_key):
+                pop.agents[i].evacuate()
+            else:
+                pop.panic[i] = min(1.0, pop.panic[i] + 0.03)
+
+        # tko se ovaj korak miče ovisi o brzini i panici
+        candidates = idx[alive & ~on_exit]
+        effective_speed = np.minimum(1.0, pop.speed[candidates] + pop.panic[candidates] * 0.3)
+        movers = candidates[self.move_rng.random(len(candidates)) <= effective_speed]
+
+        self.adapt_strategies(movers)
+        return movers
+
+    # adapt_strategy za sve koji se miču
+    def adapt_strategies(self, idx):
+        pop = self.population
+        panic = pop.panic[idx]
+        stuck = pop.stuck_steps[idx] >= 5
+
+        strategy = np.select(
+            [stuck, panic > 0.7, panic > 0.5, panic >= 0.2],
+            [LEAST_CROWDED, SHORTEST, LEAST_CROWDED, SAFEST],
+            default=-1
+        )
+        undecided = strategy == -1
+        strategy[undecided] = self.move_rng.integers(len(STRATEGIES), size=int(undecided.sum()))
 
-        for exit_key in self.exit_info:
-            self.exit_flow_history[exit_key].append(self.exit_flow_step[exit_key])
+        pop.strategy[idx] = strategy
+        pop.panic[idx[stuck]] = np.minimum(1.0, panic[stuck] + 0.15)
 
-            fid, ex, ey = exit_key
-            q = 0
-            for nb in self.neighbors4(fid, (ex, ey)):
-                q += sum(
-                    1 for a in self.grids[fid].get_cell_list_contents(nb)
-                    if isinstance(a, EvacueeAgent) and not getattr(a, "dead", False) and not getattr(a, "evacuated", False)
-                )
-            self.exit_queue_history[exit_key].append(q)
+    #  koraci
+    def step(self):
+        self.reset_exit_step_capacity()
+        if not self.running:
+            return
+
+        if self.profiler is not None:
+            self.profiler.begin_step()
 
+        with self.phase("spread_smoke"):
+            self.spread_smoke()
 
-        self.history["steps"].append(self.steps)
-        self.history["evacuated"].append(self.evacuated_count)
-        self.history["dead"].append(self.dead_count)
+        with self.phase("alarm_broadcast"):
+            self.broadcast_alarms()
 
-        if hasattr(self, "step_signal"):
-            self.step_signal.value += 1
+        with self.phase("exit_fields"):
+            self.update_exit_fields()
+
+        # alarmi su jedini preostali agenti s vlastitim step()
+        if self.profiler is None:
+            for alarm in self.alarms:
+                alarm.step()
+        else:
+            self.profiler.step_agents(self.alarms)
+
+        self.step_evacuees()
+
+        with self.phase("termination_check"):
+            pop = self.population
+            status = pop.column("status")
+            self.dead_count = int((status == DEAD).sum())
+
+            alive = np.nonzero(status == ACTIVE)[0]
+            current_evacuees = [pop.agents[i] for i in alive]
+
+            self.update_reachability()
+            self.publish_escape_status(current_evacuees)
+            self.trapped_count = sum(1 for st in self.escape_status.values() if st.trapped)
+            can_anyone_escape = self.trapped_count < len(current_evacuees)
+
+        with self.phase("exit_bookkeeping"):
+            flows = []
+            queues = []
+            for exit_key in self.exit_info:
+                flows.append(self.exit_flow_step[exit_key])
+
+                fid, ex, ey = exit_key
+                q = 0
+                for nb in self.neighbors4(fid, (ex, ey)):
+                    q += int(self.grids[fid].evacuees[nb])
+                queues.append(q)
+
+            mean_panic = float(pop.panic[alive].mean()) if len(alive) else 0.0
+
+            self.recorder.record(
+                self.steps,
+                self.evacuated_count,
+                self.dead_count,
+                len(self.smoke_cells),
+                mean_panic,
+                flows,
+                queues,
+                final=not current_evacuees or not can_anyone_escape
+            )
+
+        if self.profiler is not None:
+            self.profiler.end_step(self.steps)
 
 
         if not current_evacuees or not can_anyone_escape:
             total_people = self.evacuated_count + self.dead_count + len(current_evacuees)
             survival_rate = (self.evacuated_count / total_people * 100) if total_people > 0 else 0
 
-            status_msg = "ZAVRŠENO (Svi procesuirani)" if not current_evacuees else "PREKINUTO (Izlazi blokirani)"
-
-            print(f"\n{status_msg}")
-            print("--- Izvještaj o evakuaciji ---")
-            print(f"Uspješno evakuirani: {self.evacuated_count}")
-            print(f"Poginuli u dimu: {self.dead_count}")
-            print(f"Zarobljeni unutra: {len(current_evacuees)}")
-            print(f"Stopa preživljavanja: {survival_rate:.2f}%")
-            print(f"Trajanje simulacije: {self.steps} koraka\n")
+            self.log_event(
+                "simulation_ended",
+                status="completed" if not current_evacuees else "blocked",
+                evacuated=self.evacuated_count,
+                dead=self.dead_count,
+                trapped=len(current_evacuees),
+                survival_rate=survival_rate
+            )
+            self.events.flush()
 
             self.running = False
             return
@@ -0,0 +1,86 @@
+import numpy as np
+
+# kodovi strategija; redoslijed je redoslijed nasumičnog odabira u adapt_strategy
+STRATEGIES = ("shortest", "least_crowded", "safest")
+SHORTEST, LEAST_CROWDED, SAFEST = range(len(STRATEGIES))
+STRATEGY_CODES = {name: code for code, name in enumerate(STRATEGIES)}
+
+ACTIVE, DEAD, EVACUATED = 0, 1, 2
+
+# stupac: (dtype, početna vrijednost)
+FIELDS = {
+    "floor": (np.int16, -1),
+    "x": (np.int32, -1),
+    "y": (np.int32, -1),
+    "placed": (bool, False),
+    "speed": (np.float64, 0.0),
+    "panic": (np.float64, 0.0),
+    "smoke_steps": (np.float64, 0.0),
+    "stuck_steps": (np.int32, 0),
+    "last_exit_dist": (np.float64, np.nan),
+    "strategy": (np.int8, SHORTEST),
+    "status": (np.int8, ACTIVE),
+    "alarm_heard": (bool, False),
+}
+
+
+class Population:
+    """Stanje svih evakuiranih u paralelnim NumPy nizovima, agent drži samo svoj indeks"""
+
+    def __init__(self, capacity=256):
+        self.size = 0
+        self.capacity = capacity
+        self.agents = []
+
+        for name, (dtype, fill) in FIELDS.items():
+            setattr(self, name, np.full(capacity, fill, dtype=dtype))
+
+    # nizovi se udvostruče kad se napune; nitko ne smije držati stari niz preko add()
+    def _grow(self):
+        capacity = self.capacity * 2
+        for name, (dtype, fill) in FIELDS.items():
+            arr = np.full(capacity, fill, dtype=dtype)
+            arr[:self.capacity] = getattr(self, name)
+            setattr(self, name, arr)
+        self.capacity = capacity
+
+    def add(self, agent):
+        if self.size == self.capacity:
+            self._grow()
+
+        idx = self.size
+        self.size += 1
+        self.agents.append(agent)
+        return idx
+
+    def column(self, name):
+        return getattr(self, name)[:self.size]
+
+    # indeksi živih agenata koji su na gridu
+    def active(self):
+        n = self.size
+        return np.nonzero((self.status[:n] == ACTIVE) & self.placed[:n])[0]
+
+    # vrijednost sloja po katu u ćeliji svakog od zadanih agenata
+    def gather(self, layers, idx, fill=0):
+        floors = self.floor[idx]
+        out = np.full(len(idx), fill, dtype=np.result_type(*(layer.dtype for layer in layers.values())))
+
+        for fid, layer in layers.items():
+            on_floor = floors == fid
+            if on_floor.any():
+                sel = idx[on_floor]
+                out[on_floor] = layer[self.x[sel], self.y[sel]]
+
+        return out
+
+
+# svojstvo agenta koje čita i piše stupac populacije
+def column_property(name, cast):
+    def get(self):
+        return cast(getattr(self._population, name)[self.idx])
+
+    def set(self, value):
+        getattr(self._population, name)[self.idx] = value
+
+    return property(get, set)
@@ -0,0 +1,104 @@
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+# metode modela i grida čiji se pozivi broje dok je profiler uključen
+COUNTED_MODEL_METHODS = ("field_next_step", "passable", "get_cost")
+COUNTED_GRID_METHODS = ("get_cell_list_contents",)
+
+
+class StepProfiler:
+    """Trajanje faza koraka i broj poziva unutarnjih petlji, po koraku simulacije"""
+
+    # bez keep_rows čuvaju se samo zbrojevi, memorija ne raste s brojem koraka
+    def __init__(self, keep_rows=True):
+        self.keep_rows = keep_rows
+        self.rows = []
+        self.totals = {}
+        self._times = {}
+        self._calls = {}
+        self._counts = {}
+
+    # zamijeni metode na instancama brojačima, bez profilera nema nikakvog troška
+    def attach(self, model):
+        for name in COUNTED_MODEL_METHODS:
+            setattr(model, name, self._counted(name, getattr(model, name)))
+
+        for grid in model.grids.values():
+            for name in COUNTED_GRID_METHODS:
+                setattr(grid, name, self._counted(name, getattr(grid, name)))
+
+    # vrati izvorne metode (brojači su atributi instance, ne mogu se spremiti u checkpoint)
+    def detach(self, model):
+        for name in COUNTED_MODEL_METHODS:
+            model.__dict__.pop(name, None)
+
+        for grid in model.grids.values():
+            for name in COUNTED_GRID_METHODS:
+                grid.__dict__.pop(name, None)
+
+    def _counted(self, name, method):
+        counts = self._counts
+
+        @wraps(method)
+        def wrapper(*args, **kwargs):
+            counts[name] = counts.get(name, 0) + 1
+            return method(*args, **kwargs)
+
+        return wrapper
+
+    def begin_step(self):
+        self._times = {}
+        self._calls = {}
+        self._counts.clear()
+
+    def add(self, phase, seconds, calls=1):
+        self._times[phase] = self._times.get(phase, 0.0) + seconds
+        self._calls[phase] = self._calls.get(phase, 0) + calls
+
+    @contextmanager
+    def phase(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - t0)
+
+    # koraci agenata istim redom kao agents.do("step"), vrijeme zbrojeno po klasi
+    def step_agents(self, agents):
+        for agent in list(agents):
+            t0 = time.perf_counter()
+            agent.step()
+            self.add(f"agents:{type(agent).__name__}", time.perf_counter() - t0)
+
+    def _record(self, step, kind, name, seconds, calls):
+        entry = self.totals.setdefault((kind, name), {"kind": kind, "name": name, "seconds": 0.0, "calls": 0})
+        entry["seconds"] += seconds or 0.0
+        entry["calls"] += calls
+
+        if self.keep_rows:
+            self.rows.append({"step": step, "kind": kind, "name": name, "seconds": seconds, "calls": calls})
+
+    def end_step(self, step):
+        for phase, seconds in self._times.items():
+            self._record(step, "phase", phase, seconds, self._calls[phase])
+
+        for name, calls in self._counts.items():
+            self._record(step, "counter", name, None, calls)
+
+    # ukupno po fazi/brojaču za cijelu simulaciju, iz tekućih zbrojeva
+    def summary(self):
+        entries = [dict(entry) for entry in self.totals.values()]
+
+        phase_total = sum(e["seconds"] for e in entries if e["kind"] == "phase")
+        for entry in entries:
+            if entry["kind"] == "phase" and phase_total > 0:
+                entry["share"] = entry["seconds"] / phase_total
+            else:
+                entry["share"] = None
+
+        return sorted(entries, key=lambda e: (e["kind"] != "phase", -e["seconds"], -e["calls"]))
+
+    def to_frame(self):
+        import pandas as pd
+        return pd.DataFrame(self.rows, columns=["step", "kind", "name", "seconds", "calls"])
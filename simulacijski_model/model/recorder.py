@@ -0,0 +1,109 @@
+import numpy as np
+
+# stupci koji postoje za svaku simulaciju, uz njih po izlazu flow_<id> i queue_<id>
+BASE_COLUMNS = (
+    ("step", np.int32),
+    ("evacuated", np.int32),
+    ("dead", np.int32),
+    ("smoke_cells", np.int32),
+    ("mean_panic", np.float32),
+)
+
+
+class TimeSeriesRecorder:
+    """Vremenski nizovi simulacije u NumPy komadima fiksne sheme, bez Python lista po vrijednosti"""
+
+    def __init__(self, exit_ids, chunk_size=1024, every=1):
+        self.exit_ids = list(exit_ids)
+        self.chunk_size = chunk_size
+        self.every = max(1, int(every))
+
+        self.schema = list(BASE_COLUMNS)
+        for exit_id in self.exit_ids:
+            self.schema.append((f"flow_{exit_id}", np.int32))
+        for exit_id in self.exit_ids:
+            self.schema.append((f"queue_{exit_id}", np.int32))
+
+        self.names = [name for name, _ in self.schema]
+        self.chunks = []
+        self.rows = 0
+        self._fill = self.chunk_size
+        self._calls = 0
+
+        # protok između dva zapisa se zbraja da ukupni protok ostane točan i uz proređivanje
+        self._flow_acc = np.zeros(len(self.exit_ids), dtype=np.int64)
+
+    def _new_chunk(self):
+        self.chunks.append({name: np.zeros(self.chunk_size, dtype=dtype) for name, dtype in self.schema})
+        self._fill = 0
+
+    # final=True zapisuje zadnji korak i kad ne pada na interval proređivanja
+    def record(self, step, evacuated, dead, smoke_cells, mean_panic, exit_flow, exit_queue, final=False):
+        self._flow_acc += exit_flow
+        self._calls += 1
+        if (self._calls - 1) % self.every and not final:
+            return
+
+        if self._fill == self.chunk_size:
+            self._new_chunk()
+
+        chunk = self.chunks[-1]
+        i = self._fill
+        chunk["step"][i] = step
+        chunk["evacuated"][i] = evacuated
+        chunk["dead"][i] = dead
+        chunk["smoke_cells"][i] = smoke_cells
+        chunk["mean_panic"][i] = mean_panic
+
+        for exit_id, flow, queue in zip(self.exit_ids, self._flow_acc, exit_queue):
+            chunk[f"flow_{exit_id}"][i] = flow
+            chunk[f"queue_{exit_id}"][i] = queue
+
+        self._flow_acc[:] = 0
+        self._fill += 1
+        self.rows += 1
+
+    def __len__(self):
+        return self.rows
+
+    # popunjeni dijelovi komada, bez kopiranja
+    def _views(self, name):
+        views = [chunk[name] for chunk in self.chunks[:-1]]
+        if self.chunks:
+            views.append(self.chunks[-1][name][:self._fill])
+        return views
+
+    # jedan stupac kao niz; kopija samo kad ima više od jednog komada
+    def column(self, name):
+        views = self._views(name)
+        if not views:
+            return np.zeros(0, dtype=dict(self.schema)[name])
+        if len(views) == 1:
+            return views[0]
+        return np.concatenate(views)
+
+    def tail(self, name, n):
+        col = self.column(name)
+        return col[max(0, len(col) - n):]
+
+    def columns(self):
+        return {name: self.column(name) for name in self.names}
+
+    # Arrow tablica nad istim memorijskim komadima (numerički stupci bez null vrijednosti se ne kopiraju)
+    def to_arrow(self):
+        import pyarrow as pa
+
+        arrays = []
+        for name, dtype in self.schema:
+            views = self._views(name)
+            arrays.append(pa.chunked_array(views, type=pa.from_numpy_dtype(dtype)))
+
+        return pa.Table.from_arrays(arrays, names=self.names)
+
+    def to_parquet(self, path):
+        import pyarrow.parquet as pq
+        pq.write_table(self.to_arrow(), path)
+
+    def to_frame(self):
+        import pandas as pd
+        return pd.DataFrame(self.columns(), columns=self.names)
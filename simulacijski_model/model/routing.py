@@ -0,0 +1,183 @@
+from collections import deque
+
+import numpy as np
+from scipy import ndimage
+
+try:
+    from model.layers import neighbor_sum
+except ImportError:
+    from layers import neighbor_sum
+
+INF = float("inf")
+EMERGENCY_EXIT_PENALTY = 15   # emergency izlaz je lošiji
+FIELD_STRATEGIES = ("shortest", "safest", "least_crowded")
+
+
+# širenje dosega izlaza u mjestu: hodanjem kroz enter ćelije i preko stepenica (izvor, odmorište);
+# vraća maske izvora stepenica preko kojih se stiže do izlaza.
+# na izvor stepenica se stupa samo dok je otvoren (open_), a tko na njemu već stoji, uvijek ih može uzeti.
+# povezana područja enter ćelija dosežu se cijela odjednom, pa red obilazi samo područja i stepenice,
+# a doseg ćelija je na kraju jedna dilatacija po katu
+def flood_reach(reach, enter, stair_pairs, open_):
+    labels = {fid: ndimage.label(floor_enter)[0] for fid, floor_enter in enter.items()}
+    active = {fid: np.zeros(floor_labels.max() + 1, dtype=bool) for fid, floor_labels in labels.items()}
+    via_stairs = {fid: np.zeros_like(floor_reach) for fid, floor_reach in reach.items()}
+
+    # odmorište je dosegnuto kad je dosegnuto njegovo područje, susjedno područje, susjedne otvorene
+    # stepenice ili kad je ono samo stepenice preko kojih se stiže do izlaza
+    by_area = {}
+    by_stair = {}
+    by_landing = {}
+    queue = deque()
+
+    for source, (tfid, tx, ty) in stair_pairs:
+        by_landing.setdefault((tfid, tx, ty), []).append(source)
+        for nx, ny in _around(labels[tfid].shape, tx, ty):
+            label = int(labels[tfid][nx, ny])
+            if label:
+                by_area.setdefault((tfid, label), []).append(source)
+            if (nx, ny) != (tx, ty):
+                by_stair.setdefault((tfid, nx, ny), []).append(source)
+
+    def reach_stairs(sources):
+        for sfid, sx, sy in sources:
+            if not via_stairs[sfid][sx, sy]:
+                via_stairs[sfid][sx, sy] = True
+                queue.append((sfid, sx, sy))
+
+    for fid, floor_reach in reach.items():
+        for label in np.unique(labels[fid][floor_reach]):
+            if label:
+                active[fid][label] = True
+                queue.append((fid, int(label)))
+
+    reach_stairs(source for source, (tfid, tx, ty) in stair_pairs if reach[tfid][tx, ty])
+
+    while queue:
+        node = queue.popleft()
+
+        if len(node) == 2:
+            reach_stairs(by_area.get(node, ()))
+            continue
+
+        fid, x, y = node
+        reach_stairs(by_landing.get(node, ()))
+        if not open_[fid][x, y]:
+            continue
+
+        # s otvorenog izvora stepenica hoda se u susjedna područja
+        for nx, ny in _around(labels[fid].shape, x, y):
+            label = labels[fid][nx, ny]
+            if label and not active[fid][label]:
+                active[fid][label] = True
+                queue.append((fid, int(label)))
+        reach_stairs(by_stair.get(node, ()))
+
+    for fid, floor_reach in reach.items():
+        spread = active[fid][labels[fid]] | (via_stairs[fid] & open_[fid])
+        floor_reach |= spread | via_stairs[fid] | (neighbor_sum(spread) > 0)
+
+    return via_stairs
+
+
+# ćelija i njezini susjedi unutar grida
+def _around(shape, x, y):
+    w, h = shape
+    return [
+        (nx, ny)
+        for nx, ny in ((x, y), (x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1))
+        if 0 <= nx < w and 0 <= ny < h
+    ]
+
+
+class ExitDistanceField:
+    """Zajednička udaljenost do izlaza za jednu strategiju (obrnuti Dijkstra iz svih izlaza),
+    računa se preko hijerarhijskog grafa soba i vrata"""
+
+    def __init__(self, model, strategy):
+        self.model = model
+        self.strategy = strategy
+        self.dist = {}
+        self.landing = {}
+
+    def compute(self):
+        graph = self.model.room_graph
+        flat = graph.distances(self.strategy)
+        self.dist = {fid: graph.floor_view(flat, fid) for fid in graph.floor_ids}
+        self.landing = graph.landing_values(self.strategy)
+        return self
+
+    # vrijednost za ulazak u ćeliju (ulazak u stepenice je odmah prelazak na drugi kat)
+    def get(self, state):
+        fid, x, y = state
+        d = self.dist[fid][x, y]
+        return None if d == INF else float(d)
+
+    # vrijednost za onoga tko na ćeliji stoji: s odmorišta koje je i samo stepenice može se i sići
+    def standing(self, state):
+        d = self.landing.get(state)
+        if d is None:
+            return self.get(state)
+        return None if d == INF else float(d)
+
+
+class ReachabilityMap:
+    """Ćelije iz kojih se uopće može doći do izlaza, jedan flood fill iz svih izlaza po koraku"""
+
+    def __init__(self, model):
+        self.model = model
+        self.reachable = {}
+
+    def compute(self):
+        model = self.model
+        reach = {}
+        open_ = {}
+        enter = {}
+
+        # u ćeliju stepenica ne ulazi se hodanjem nego preko odmorišta na drugom katu
+        for fid, grid in model.grids.items():
+            reach[fid] = np.zeros((grid.width, grid.height), dtype=bool)
+            open_[fid] = grid.open_mask()
+            enter[fid] = open_[fid].copy()
+
+        for fid, x, y in model.stair_links:
+            enter[fid][x, y] = False
+
+        for fid, x, y in model.exits:
+            reach[fid][x, y] = True
+
+        # stepenice (izvor, odmorište) preko kojih se može preći: odmorište mora biti otvoreno kao i za pomak
+        stair_pairs = [
+            ((fid, x, y), (tfid, x, y))
+            for (fid, x, y), tfid in model.stair_links.items()
+            if model.passable(tfid, (x, y))
+        ]
+
+        via_stairs = flood_reach(reach, enter, stair_pairs, open_)
+
+        self.reachable = reach
+        self.via_stairs = via_stairs
+        return self
+
+    def is_reachable(self, floor_id, pos):
+        return bool(self.reachable[floor_id][pos])
+
+    # ima li agent s ove pozicije barem jedan korak prema ćeliji s putem do izlaza
+    def can_reach(self, floor_id, pos, agent=None):
+        model = self.model
+        x, y = pos
+
+        if (floor_id, x, y) in model.exits:
+            return True
+
+        # susjedne stepenice vrijede samo ako se preko njih stvarno prelazi
+        floor_reach = self.reachable[floor_id]
+        via_stairs = self.via_stairs[floor_id]
+        for nb in model.neighbors4(floor_id, pos, agent):
+            if (floor_id, *nb) in model.stair_links:
+                if via_stairs[nb]:
+                    return True
+            elif floor_reach[nb]:
+                return True
+
+        return bool(via_stairs[pos])
@@ -0,0 +1,25 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+LAYOUT = os.path.join(ROOT, "podaci", "building_layout.json")
+
+
+@pytest.fixture
+def make_model():
+    from model.model import EvaluationModel
+    from model.events import EventLog
+
+    def make(seed=0, **kwargs):
+        return EvaluationModel(LAYOUT, seed=seed, event_log=EventLog(enabled=False), **kwargs)
+
+    return make
+
+
+@pytest.fixture
+def layout_path():
+    return LAYOUT
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from model.model import EvaluationModel
+
+CHECKPOINT_STEP = 20
+MORE_STEPS = 30
+
+
+def advance(model, steps):
+    for _ in range(steps):
+        if not model.running:
+            break
+        model.step()
+
+
+def assert_same_run(model, other):
+    assert other.steps == model.steps
+    assert other.evacuated_count == model.evacuated_count
+    assert other.dead_count == model.dead_count
+    for name, column in model.recorder.columns().items():
+        np.testing.assert_array_equal(other.recorder.column(name), column, err_msg=name)
+
+
+# vraćeni checkpoint i grana nastavljaju korak za korakom kao izvorni model (i RNG)
+@pytest.mark.parametrize("synchronous", [False, True])
+def test_restore_and_fork_continue_like_the_original(make_model, tmp_path, synchronous):
+    model = make_model(2, synchronous=synchronous)
+    advance(model, CHECKPOINT_STEP)
+
+    path = tmp_path / "model.ckpt"
+    model.checkpoint(str(path))
+    data = model.checkpoint()
+    forked = model.fork()
+
+    advance(model, MORE_STEPS)
+    assert model.steps > CHECKPOINT_STEP
+
+    for other in (EvaluationModel.restore(str(path)), EvaluationModel.restore(data), forked):
+        assert other.steps == CHECKPOINT_STEP
+        advance(other, MORE_STEPS)
+        assert_same_run(model, other)
@@ -0,0 +1,35 @@
+import json
+
+import cli
+
+
+def test_core_import_within_budget():
+    result = cli.measure_import()
+
+    assert result["ui_modules"] == []
+    assert result["seconds"] <= cli.IMPORT_BUDGET_S
+
+
+def test_run_stops_at_max_steps(layout_path, tmp_path, capsys):
+    out = tmp_path / "summary.json"
+    cli.main(["run", "--layout", layout_path, "--seed", "2", "--max-steps", "10", "--out", str(out)])
+
+    summary = json.loads(out.read_text(encoding="utf-8"))
+    assert not summary["finished"]
+    assert summary["steps"] == 10
+    assert "nije završila" in capsys.readouterr().err
+
+
+def test_run_defaults_to_a_step_cap():
+    args = cli.build_parser().parse_args(["run"])
+    assert args.max_steps == cli.MAX_STEPS
+
+
+# granica je u koracima modela: svaki step() je jedan zapisani red, brojač ne preskače
+def test_step_advances_one_tick(make_model):
+    model = make_model(2)
+    for _ in range(10):
+        model.step()
+
+    assert model.steps == 10
+    assert model.recorder.column("step").tolist() == list(range(1, 11))
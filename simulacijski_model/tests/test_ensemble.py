@@ -0,0 +1,29 @@
+from ensemble import run_ensemble, unfinished_count
+
+
+def base(layout_path, max_steps):
+    return {
+        "layout": layout_path,
+        "smoke_spread_prob": 0.15,
+        "min_speed": 0.5,
+        "max_speed": 1.0,
+        "fire_sources": None,
+        "max_steps": max_steps,
+        "synchronous": False,
+    }
+
+
+def test_unfinished_runs_stay_out_of_statistics(layout_path):
+    df, summary, stopped = run_ensemble(base(layout_path, 10), min_runs=2, max_runs=3, workers=1)
+
+    assert len(df) == 3
+    assert unfinished_count(df) == 3
+    assert summary["steps"]["n"] == 0
+    assert not stopped
+
+
+def test_finished_runs_are_counted(layout_path):
+    df, summary, _ = run_ensemble(base(layout_path, 5000), min_runs=2, max_runs=2, workers=1)
+
+    assert unfinished_count(df) == 0
+    assert summary["survival_rate"]["n"] == 2
@@ -0,0 +1,85 @@
+import random
+
+import numpy as np
+import pytest
+
+from model import hierarchy
+from model.hierarchy import MIN_REPAIR_SIZE
+from model.routing import FIELD_STRATEGIES
+
+ROUNDS = 6
+CELLS_PER_ROUND = 4
+
+
+# geometrija kao generated_large iz benchmarka, s manje ljudi da se model brzo gradi
+@pytest.fixture(scope="module")
+def large_model(tmp_path_factory):
+    from layout_generator import generate_layout, write_layout
+    from model.model import EvaluationModel
+    from model.events import EventLog
+
+    path = tmp_path_factory.mktemp("layouts") / "generated_large.json"
+    write_layout(generate_layout(width=120, height=80, floors=5, occupants=100, seed=0), str(path))
+    return EvaluationModel(str(path), seed=0, event_log=EventLog(enabled=False))
+
+
+# gužva zatvara ćeliju bez promjene cijene stepenica (dim je mijenja)
+def crowd(model, key, delta):
+    fid, x, y = key
+    grid = model.grids[fid]
+    grid.evacuees[x, y] += delta
+    grid.changed_cells.add(key)
+
+
+# popravak nakon promjena, pa usporedba s punim Dijkstrom iz istog stanja ćelija
+def repair_and_compare(model):
+    graph = model.room_graph
+    graph.mark_changed(model.take_changed_cells())
+
+    for strategy in FIELD_STRATEGIES:
+        tables = graph.tables[strategy]
+        changes = graph._apply_pending(strategy, tables)
+        assert graph._repair(tables, *changes), strategy
+
+        # _full na kopiji ne dira g/rhs popravka, sljedeći krug nastavlja iz popravljenog stanja
+        reference = dict(tables)
+        full = graph._full(reference)
+        np.testing.assert_allclose(tables["out"], full, err_msg=strategy)
+        np.testing.assert_allclose(tables["landing"], reference["landing"], err_msg=strategy)
+
+
+def test_repair_matches_full_after_blocking_and_unblocking(large_model, monkeypatch):
+    # provjerava se točnost popravka, ne kad se on isplati: bez budžeta nema povratka na puni Dijkstra
+    monkeypatch.setattr(hierarchy, "REPAIR_COST_RATIO", 1e-9)
+
+    model = large_model
+    graph = model.room_graph
+    assert graph.backbone_count >= MIN_REPAIR_SIZE
+
+    model.update_exit_fields()
+
+    # hodnici i odmorišta stepenica, da se popravljaju i prijelazi među katovima
+    corridor = [
+        (fid, x, y)
+        for fid, grid in model.grids.items()
+        for x, y in zip(*np.nonzero(grid.corridor & ~grid.wall & (grid.smoke == 0)))
+        if (fid, x, y) not in model.exits
+    ]
+    landings = sorted({(tfid, x, y) for (fid, x, y), tfid in model.stair_links.items()})
+
+    rng = random.Random(0)
+    for _ in range(ROUNDS):
+        smoky = rng.sample(corridor, CELLS_PER_ROUND) + rng.sample(landings, 1)
+        crowded = rng.sample(landings, 1)
+
+        for fid, x, y in smoky:
+            model.grids[fid].add_smoke((x, y))
+        for key in crowded:
+            crowd(model, key, 3)
+        repair_and_compare(model)
+
+        for fid, x, y in smoky:
+            model.grids[fid].clear_smoke((x, y))
+        for key in crowded:
+            crowd(model, key, -3)
+        repair_and_compare(model)
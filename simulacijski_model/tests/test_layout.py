@@ -0,0 +1,60 @@
+import copy
+import json
+
+import pytest
+
+from model.layout import LayoutError, compile_layout
+
+
+@pytest.fixture
+def layout(layout_path):
+    with open(layout_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def broken(layout, change):
+    layout = copy.deepcopy(layout)
+    change(layout)
+    return layout
+
+
+def move_first(key, **values):
+    def change(layout):
+        layout[key][0].update(values)
+    return change
+
+
+def set_fire(layout):
+    layout["hazards"]["fire_sources"][0]["position"] = {"x": -1, "y": 5}
+
+
+def set_random_floor(layout):
+    layout["hazards"]["random_fire_sources"]["allowed_floors"] = [0, 7]
+
+
+def renumber_ground(layout):
+    layout["floors"][0]["floor_id"] = 5
+
+
+@pytest.mark.parametrize("change, message", [
+    (move_first("alarms", x=999), "alarm"),
+    (move_first("alarms", floor=3), "nepostojećem katu 3"),
+    (move_first("ventilation", y=-2), "ventilacija"),
+    (move_first("ventilation", floor=9), "nepostojećem katu 9"),
+    (set_fire, "izvor požara"),
+    (set_random_floor, "slučajni požar"),
+    (renumber_ground, "prizemlje"),
+])
+def test_bad_references_raise_layout_error(layout, change, message):
+    with pytest.raises(LayoutError, match=message):
+        compile_layout(broken(layout, change))
+
+
+def test_fire_sources_from_arguments_are_checked(make_model):
+    with pytest.raises(LayoutError, match="izvor požara"):
+        make_model(1, fire_sources=[(0, 500, 3)])
+
+
+def test_valid_layout_compiles(layout):
+    compiled = compile_layout(layout)
+    assert all(compiled.report["rooms"].values())
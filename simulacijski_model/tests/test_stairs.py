@@ -0,0 +1,82 @@
+import pytest
+
+MAX_STEPS = 2000
+
+# sjemena koja su prije čekala zauvijek na zadimljenom odmorištu
+SMOKY_STAIR_SEEDS = (2, 7, 17, 21, 28)
+
+
+def smoke_landing(model):
+    (fid, x, y), tfid = next(iter(model.stair_links.items()))
+    model.grids[tfid].add_smoke((x, y))
+    return fid, (x, y), tfid
+
+
+@pytest.mark.parametrize("synchronous", [False, True])
+@pytest.mark.parametrize("seed", SMOKY_STAIR_SEEDS)
+def test_smoky_stairs_terminate(make_model, seed, synchronous):
+    model = make_model(seed, synchronous=synchronous)
+    while model.running and model.steps < MAX_STEPS:
+        model.step()
+
+    assert not model.running
+
+
+def test_smoky_landing_is_not_reachable(make_model):
+    model = make_model(2)
+    fid, pos, tfid = smoke_landing(model)
+
+    reach = model.update_reachability()
+    assert not reach.via_stairs[fid][pos]
+
+    # polje i kretanje: stepenice sa zadimljenim odmorištem ne vode nikamo
+    model.update_exit_fields()
+    assert model.exit_field("shortest").get((fid, *pos)) is None
+    assert not model.passable(tfid, pos)
+
+
+# okno stepenica: odmorište je i samo stepenice, s njega se silazi na kat
+def test_stacked_stairs_lead_to_an_exit(make_model):
+    model = make_model(0)
+    model.update_exit_fields()
+    field = model.exit_field("shortest")
+
+    for (fid, x, y), tfid in model.stair_links.items():
+        assert (tfid, x, y) in model.stair_links
+        assert field.get((fid, x, y)) is not None
+        assert field.standing((tfid, x, y)) < field.get((fid, x, y))
+
+
+# kat 1 dohvaća izlaz samo preko stepenica, iza zida kata 0 je odsječeni dio
+def test_flood_reach_crosses_stairs_only_to_open_areas():
+    import numpy as np
+    from model.routing import flood_reach
+
+    open_ = {0: np.ones((5, 3), dtype=bool), 1: np.ones((5, 3), dtype=bool)}
+    open_[0][2, :] = False
+    enter = {fid: mask.copy() for fid, mask in open_.items()}
+    enter[1][0, 1] = False
+    reach = {0: np.zeros((5, 3), dtype=bool), 1: np.zeros((5, 3), dtype=bool)}
+    reach[0][0, 0] = True
+
+    via_stairs = flood_reach(reach, enter, [((1, 0, 1), (0, 0, 1))], open_)
+
+    assert via_stairs[1][0, 1]
+    assert reach[1].all()
+    assert reach[0][:3].all() and not reach[0][3:].any()
+
+
+# pune stepenice (3 osobe) ne propuštaju one oko sebe, doseg i polje se moraju slagati
+@pytest.mark.parametrize("seed", [1, 2])
+def test_reachability_agrees_with_exit_field(make_model, seed):
+    model = make_model(seed)
+    while model.running and model.steps < 60:
+        model.step()
+        model.update_exit_fields()
+        reach = model.update_reachability()
+
+        pop = model.population
+        for i in pop.active():
+            agent = pop.agents[i]
+            has_move = model.field_next_step(agent.floor, agent.pos) is not None
+            assert has_move == reach.can_reach(agent.floor, agent.pos), (model.steps, agent.floor, agent.pos)
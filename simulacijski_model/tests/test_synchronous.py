@@ -0,0 +1,58 @@
+import numpy as np
+
+from model.population import ACTIVE
+
+MAX_STEPS = 400
+SEED = 3
+
+
+# broj živih po ćeliji iz populacije, u obliku sloja evacuees svakog kata
+def population_counts(model):
+    pop = model.population
+    idx = pop.active()
+    counts = {}
+    for fid, grid in model.grids.items():
+        layer = np.zeros((grid.width, grid.height), dtype=np.int64)
+        on_floor = idx[pop.floor[idx] == fid]
+        np.add.at(layer, (pop.x[on_floor], pop.y[on_floor]), 1)
+        counts[fid] = layer
+    return counts
+
+
+def run(make_model):
+    model = make_model(SEED, synchronous=True)
+    pop = model.population
+    transfers = 0
+
+    while model.running and model.steps < MAX_STEPS:
+        before = pop.floor[:pop.size].copy()
+        model.step()
+
+        # ždrijeb i kaskada odbijanja nikad ne puste četvrtog u ćeliju
+        counts = population_counts(model)
+        for fid, grid in model.grids.items():
+            assert grid.evacuees.max() <= 3, (model.steps, fid)
+            np.testing.assert_array_equal(grid.evacuees, counts[fid], err_msg=f"korak {model.steps}, kat {fid}")
+
+        moved = (pop.status[:pop.size] == ACTIVE) & (pop.floor[:pop.size] != before)
+        transfers += int(moved.sum())
+
+    return model, transfers
+
+
+def test_synchronous_steps_keep_cells_consistent(make_model):
+    model, transfers = run(make_model)
+
+    assert not model.running
+    assert transfers > 0
+
+
+def test_synchronous_run_is_deterministic(make_model):
+    first, _ = run(make_model)
+    second, _ = run(make_model)
+
+    assert first.steps == second.steps
+    assert first.evacuated_count == second.evacuated_count
+    assert first.dead_count == second.dead_count
+    for name, column in first.recorder.columns().items():
+        np.testing.assert_array_equal(column, second.recorder.column(name), err_msg=name)
@@ -0,0 +1,128 @@
+import numpy as np
+from matplotlib.colors import to_rgba
+from matplotlib.figure import Figure
+
+from model.agent import EvacueeAgent
+from .portrayal import PANIC_COLORS, TRAPPED_COLOR, ALARM_COLORS
+
+# boje statične geometrije kata
+WALL_COLOR = "black"
+EXIT_COLOR = "green"
+VENTILATION_COLOR = "#b3b300"
+STAIR_COLOR = "#400040"
+
+# boja dima po razredu topline: <3, <6, <9, ostalo
+HEAT_BINS = (3, 6, 9)
+SMOKE_COLORS = ("#d3d3d3", "#a9a9a9", "#696969", "#6f0000")
+
+
+def _rgba_bytes(color):
+    return (np.asarray(to_rgba(color)) * 255).astype(np.uint8)
+
+
+# statična geometrija kata kao jedna RGBA slika (y, x), gradi se jednom
+def static_background(model, floor_id):
+    grid = model.grids[floor_id]
+    img = np.zeros((grid.height, grid.width, 4), dtype=np.uint8)
+
+    img[grid.ventilation.T] = _rgba_bytes(VENTILATION_COLOR)
+    img[grid.wall.T] = _rgba_bytes(WALL_COLOR)
+
+    exit_color = _rgba_bytes(EXIT_COLOR)
+    for fid, x, y in model.exits:
+        if fid == floor_id:
+            img[y, x] = exit_color
+
+    return img
+
+
+class FloorFigure:
+    """Prikaz kata: statična pozadina jednom, dim i ljudi kao slojevi nad nizovima"""
+
+    def __init__(self, model, floor_id):
+        self.model = model
+        self.floor_id = floor_id
+        grid = model.grids[floor_id]
+
+        self.figure = Figure(figsize=(6, 6 * grid.height / max(grid.width, 1)))
+        self.ax = self.figure.add_subplot(111)
+
+        extent = (-0.5, grid.width - 0.5, -0.5, grid.height - 0.5)
+        self.ax.imshow(
+            static_background(model, floor_id), origin="lower", extent=extent,
+            interpolation="nearest", zorder=1
+        )
+
+        stairs = [(x, y) for (fid, x, y) in model.stair_links if fid == floor_id]
+        if stairs:
+            sx, sy = zip(*stairs)
+            self.ax.scatter(sx, sy, marker="^", color=STAIR_COLOR, zorder=2)
+
+        # sloj dima se puni u isti niz svaki put
+        self.smoke_rgba = np.zeros((grid.height, grid.width, 4), dtype=np.uint8)
+        self.smoke_palette = np.stack([_rgba_bytes(c) for c in SMOKE_COLORS])
+        self.smoke_image = self.ax.imshow(
+            self.smoke_rgba, origin="lower", extent=extent, interpolation="nearest", zorder=3
+        )
+
+        empty = np.zeros((0, 2))
+        self.evacuee_dots = self.ax.scatter(empty[:, 0], empty[:, 1], s=25, marker="o", zorder=5)
+        self.trapped_marks = self.ax.scatter(empty[:, 0], empty[:, 1], s=25, marker="X",
+                                             color=TRAPPED_COLOR, zorder=5)
+
+        self.floor_alarms = [a for a in model.alarms if a.floor == floor_id]
+        alarm_xy = np.array([a.position for a in self.floor_alarms], dtype=float).reshape(-1, 2)
+        self.alarm_marks = self.ax.scatter(alarm_xy[:, 0], alarm_xy[:, 1], s=40, marker="s", zorder=6)
+
+        self.ax.set_xlim(extent[0], extent[1])
+        self.ax.set_ylim(extent[2], extent[3])
+        self.ax.set_aspect("equal")
+        self.ax.set_xticks([])
+        self.ax.set_yticks([])
+        self.figure.tight_layout()
+
+    def _update_smoke(self):
+        grid = self.model.grids[self.floor_id]
+        heat = self.model.heat[self.floor_id]
+
+        tier = np.digitize(heat, HEAT_BINS)
+        rgba = self.smoke_palette[tier]
+        rgba[grid.smoke == 0] = 0
+
+        self.smoke_rgba[:] = rgba.transpose(1, 0, 2)
+        self.smoke_image.set_data(self.smoke_rgba)
+
+    # ljudi se čitaju preko ćelija s evakuiranima, ne preko svih agenata modela
+    def _update_evacuees(self):
+        model = self.model
+        grid = model.grids[self.floor_id]
+
+        dots, colors, trapped = [], [], []
+        for _, x, y in grid.evacuee_cells:
+            for agent in grid.get_cell_list_contents([(x, y)]):
+                if not isinstance(agent, EvacueeAgent):
+                    continue
+
+                status = model.escape_status.get(agent.unique_id)
+                if status is None:
+                    status = model.escape_status_of(agent)
+
+                if status.trapped and status.smoke_exposed:
+                    trapped.append((x, y))
+                else:
+                    dots.append((x, y))
+                    colors.append(PANIC_COLORS[status.panic_tier])
+
+        self.evacuee_dots.set_offsets(np.array(dots, dtype=float).reshape(-1, 2))
+        self.evacuee_dots.set_facecolor(colors or "none")
+        self.trapped_marks.set_offsets(np.array(trapped, dtype=float).reshape(-1, 2))
+
+    def update(self, model):
+        self._update_smoke()
+        self._update_evacuees()
+
+        if self.floor_alarms:
+            self.alarm_marks.set_facecolor([ALARM_COLORS.get(a.state, "gray") for a in self.floor_alarms])
+
+    def close(self):
+        self.figure.clear()
@@ -0,0 +1,119 @@
+import time
+
+import numpy as np
+from matplotlib.figure import Figure
+
+# zadano: crtanje svakih 5 koraka, najviše 2 puta u sekundi
+RENDER_EVERY = 5
+RENDER_MAX_PER_SECOND = 2.0
+
+
+class RenderThrottle:
+    """Odlučuje treba li ponovno crtati graf u ovom koraku"""
+
+    def __init__(self, every=RENDER_EVERY, max_per_second=RENDER_MAX_PER_SECOND):
+        self.every = max(1, int(every))
+        self.min_interval = 1.0 / max_per_second if max_per_second else 0.0
+        self.last_step = None
+        self.last_time = 0.0
+
+    def due(self, step, force=False):
+        now = time.perf_counter()
+
+        if not force and self.last_step is not None:
+            if step - self.last_step < self.every:
+                return False
+            if now - self.last_time < self.min_interval:
+                return False
+
+        if step == self.last_step:
+            return False
+
+        self.last_step = step
+        self.last_time = now
+        return True
+
+
+# figure se ne registriraju u pyplotu, pa ih ne treba zatvarati preko plt.close
+class ExitFlowFigure:
+    """Stupčasti graf protoka po izlazima sa stalnim brojem stupaca koji se samo pomiču"""
+
+    def __init__(self, exit_ids, last_n=100):
+        self.exit_ids = list(exit_ids)
+        self.last_n = last_n
+
+        self.figure = Figure(figsize=(10, 6))
+        self.ax = self.figure.add_subplot(111)
+
+        x = np.arange(last_n)
+        zeros = np.zeros(last_n)
+        self.bars = [
+            self.ax.bar(x, zeros, label=exit_id, bottom=zeros, width=0.8)
+            for exit_id in self.exit_ids
+        ]
+
+        self.ax.set_title("Protok evakuiranih po izlazima")
+        self.ax.set_xlabel("Korak simulacije")
+        self.ax.set_ylabel("Broj evakuiranih u koraku")
+        if self.exit_ids:
+            self.ax.legend(loc="upper left")
+        self.ax.grid(True, axis='y', alpha=0.3)
+
+    def update(self, model):
+        recorder = model.recorder
+        steps = recorder.tail("step", self.last_n)
+        n = len(steps)
+        if not n:
+            return
+
+        bottom = np.zeros(n)
+        for exit_id, bars in zip(self.exit_ids, self.bars):
+            heights = recorder.tail(f"flow_{exit_id}", self.last_n)
+
+            # višak stupaca (na početku simulacije) ostaje prazan
+            for i, rect in enumerate(bars.patches):
+                if i < n:
+                    rect.set_x(steps[i] - 0.4)
+                    rect.set_y(bottom[i])
+                    rect.set_height(heights[i])
+                else:
+                    rect.set_height(0)
+
+            bottom += heights
+
+        self.ax.set_xlim(steps[0] - 1, max(steps[-1] + 1, steps[0] + self.last_n))
+        self.ax.set_ylim(0, max(1.0, float(bottom.max()) * 1.1))
+
+    def close(self):
+        self.figure.clear()
+
+
+class ProgressFigure:
+    """Linije evakuiranih i poginulih kroz vrijeme, podaci se mijenjaju bez novih artista"""
+
+    def __init__(self):
+        self.figure = Figure()
+        self.ax = self.figure.add_subplot(111)
+
+        (self.evacuated_line,) = self.ax.plot([], [], label="Evakuirani")
+        (self.dead_line,) = self.ax.plot([], [], label="Poginuli")
+
+        self.ax.set_title("Tijek evakuacije kroz vrijeme")
+        self.ax.set_xlabel("Broj ljudi")
+        self.ax.set_ylabel("Broj koraka")
+        self.ax.legend()
+
+    def update(self, model):
+        recorder = model.recorder
+        if not len(recorder):
+            return
+
+        steps = recorder.column("step")
+        self.evacuated_line.set_data(steps, recorder.column("evacuated"))
+        self.dead_line.set_data(steps, recorder.column("dead"))
+
+        self.ax.relim()
+        self.ax.autoscale_view()
+
+    def close(self):
+        self.figure.clear()
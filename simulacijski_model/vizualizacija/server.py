@@ -1,130 +1,165 @@
-from mesa.visualization import SolaraViz
-from mesa.visualization.components import make_space_component
-from model.model import EvaluationModel
-from .portrayal import building_portrayal
-import solara
-from types import SimpleNamespace
-import matplotlib.pylab as plt
-
-model = EvaluationModel("podaci/building_layout.json")
-space = make_space_component(building_portrayal)
-
-step_signal = solara.reactive(0)
-model.step_signal = step_signal
-
-@solara.component
-def GroundFloorPage(model):
-    proxy_model = SimpleNamespace(
-        grid=model.grids[0],
-        agents=model.agents,
-        active_floor = 0,
-        heat = model.heat
-    )
-    solara.Markdown("## Prizemlje")
-    space(proxy_model)
+import glob
 
-@solara.component
-def FirstFloorPage(model):
-    proxy_model = SimpleNamespace(
-        grid=model.grids[1],
-        agents=model.agents,
-        active_floor = 1,
-        heat = model.heat
-        )
-    solara.Markdown("## 1. kat")
-    space(proxy_model)
+from .floor_view import FloorFigure
+from .plots import ExitFlowFigure, ProgressFigure, RenderThrottle, RENDER_EVERY, RENDER_MAX_PER_SECOND
+from .session import SimulationSession, DEFAULT_LAYOUT, TARGET_RATE, BATCH_STEPS
+import solara
 
-@solara.component
-def ExitFlowPlot(model, last_n: int = 100):
-    _ = step_signal.value
-    steps = model.steps
-    n = min(last_n, steps)
+# katovi se crtaju češće od grafova, ali ne više od 5 puta u sekundi
+FLOOR_MAX_PER_SECOND = 5.0
 
-    fig = plt.figure(figsize=(10, 6))
-    ax = fig.add_subplot(111)
+LAYOUTS = sorted(glob.glob("podaci/*.json")) or [DEFAULT_LAYOUT]
 
-    exit_data = {}
-    max_len = 0
+def floor_title(floor_id):
+    return "## Prizemlje" if floor_id == 0 else f"## {floor_id}. kat"
 
-    for exit_key, info in model.exit_info.items():
-        hist = model.exit_flow_history.get(exit_key, [])
-        if hist:
-            exit_data[info["id"]] = hist
-            max_len = max(max_len, len(hist))
+# graf živi koliko i model sesije, crta se iznova samo kad to dopusti throttle;
+# figura se gradi i puni iz objavljenog stanja dok dretva čeka na lock, PNG se radi izvan locka
+def use_live_figure(session, make_plot, every, max_per_second):
+    model = session.model
 
-    if not exit_data:
-        solara.FigureMatplotlib(fig)
-        return
+    with session.lock:
+        plot = solara.use_memo(make_plot, [model])
+    throttle = solara.use_memo(lambda: RenderThrottle(every, max_per_second), [model, every, max_per_second])
+    drawn = solara.use_ref(0)
 
-    start_step = max(0, max_len - n)
-    x_steps = list(range(start_step, max_len))
+    def cleanup():
+        return plot.close
 
-    bottom = [0] * len(x_steps)
+    solara.use_effect(cleanup, [plot])
 
-    for exit_name, hist in exit_data.items():
-        y_data = hist[start_step:max_len]
+    with session.lock:
+        if throttle.due(model.steps, force=not model.running):
+            plot.update(model)
+            drawn.current += 1
 
-        ax.bar(x_steps, y_data, label=exit_name, bottom=bottom, width=0.8)
+    return plot, drawn.current
 
-        bottom = [bottom[i] + y_data[i] for i in range(len(y_data))]
+@solara.component
+def FloorPage(session, version, floor_id, title, every: int = 1, max_per_second: float = FLOOR_MAX_PER_SECOND):
+    model = session.model
+    plot, drawn = use_live_figure(session, lambda: FloorFigure(model, floor_id), every, max_per_second)
+    solara.Markdown(title)
+    solara.FigureMatplotlib(plot.figure, dependencies=[plot, drawn], format="png")
 
-    ax.set_title("Protok evakuiranih po izlazima")
-    ax.set_xlabel("Korak simulacije")
-    ax.set_ylabel("Broj evakuiranih u koraku")
-    ax.legend(loc="upper left")
-    ax.grid(True, axis='y', alpha=0.3)
+@solara.component
+def ExitFlowPlot(session, version, last_n: int = 100, every: int = RENDER_EVERY,
+                 max_per_second: float = RENDER_MAX_PER_SECOND):
+    model = session.model
+    plot, drawn = use_live_figure(
+        session,
+        lambda: ExitFlowFigure(model.recorder.exit_ids, last_n),
+        every,
+        max_per_second
+    )
+    solara.FigureMatplotlib(plot.figure, dependencies=[plot, drawn], format="png")
 
-    solara.FigureMatplotlib(fig)
+@solara.component
+def EvacuationProgressPlot(session, version, every: int = RENDER_EVERY, max_per_second: float = RENDER_MAX_PER_SECOND):
+    plot, drawn = use_live_figure(session, ProgressFigure, every, max_per_second)
+    solara.FigureMatplotlib(plot.figure, dependencies=[plot, drawn], format="png")
 
 @solara.component
-def EvacuationProgressPlot(model):
-    _ = step_signal.value
-    if not model.history["steps"]:
-        return
-
-    fig = plt.figure()
-    ax = fig.add_subplot(111)
-
-    ax.plot(
-        model.history["steps"],
-        model.history["evacuated"],
-        label = "Evakuirani"
-    )
-    ax.plot(
-        model.history["steps"],
-        model.history["dead"],
-        label="Poginuli",
-    )
+def ProfilerTable(session, version):
+    model = session.model
+    with session.lock:
+        if model.profiler is None or not model.profiler.totals:
+            return
+        summary = model.profiler.summary()
+
+    lines = [
+        "| Faza / brojač | Ukupno (ms) | Udio | Pozivi |",
+        "|---|---:|---:|---:|",
+    ]
+    for entry in summary:
+        if entry["kind"] == "phase":
+            lines.append(
+                f"| {entry['name']} | {entry['seconds'] * 1000:.1f} | {entry['share'] * 100:.1f}% | {entry['calls']} |"
+            )
+        else:
+            lines.append(f"| {entry['name']} | | | {entry['calls']} |")
+
+    solara.Markdown("### Profil koraka\n\n" + "\n".join(lines))
 
-    ax.set_title("Tijek evakuacije kroz vrijeme")
-    ax.set_xlabel("Broj ljudi")
-    ax.set_ylabel("Broj koraka")
-    ax.legend()
+@solara.component
+def Controls(session, version):
+    layout = solara.use_reactive(LAYOUTS[0])
+    seed = solara.use_reactive(0)
+    rate = solara.use_reactive(TARGET_RATE)
+    batch = solara.use_reactive(BATCH_STEPS)
+
+    # brzina i veličina paketa vrijede odmah, dretva ih čita prije svakog paketa
+    session.rate = rate.value
+    session.batch = batch.value
+
+    def reset():
+        session.reset(layout=layout.value, seed=seed.value or None)
+
+    with session.lock:
+        model = session.model
+        status = (
+            f"Korak **{model.steps}** · evakuirani **{model.evacuated_count}** · poginuli **{model.dead_count}**"
+            + ("" if model.running else " · završeno")
+        )
 
-    solara.FigureMatplotlib(fig)
+    with solara.Row(gap="10px", style={"align-items": "center"}):
+        if session.playing:
+            solara.Button("Pauza", on_click=session.pause)
+        else:
+            solara.Button("Pokreni", on_click=session.start, disabled=not model.running)
+        solara.Button("Korak", on_click=session.step_once, disabled=session.playing or not model.running)
+        solara.Button("Ponovno", on_click=reset)
+        solara.Select("Raspored", values=LAYOUTS, value=layout)
+        solara.InputInt("Seed (0 = nasumično)", value=seed)
+    with solara.Row(gap="10px"):
+        solara.SliderFloat("Koraka u sekundi (0 = najbrže)", value=rate, min=0, max=100, step=1)
+        solara.SliderInt("Koraka između objava", value=batch, min=1, max=50)
+        solara.Switch(label="Profil koraka", value=session.profiling, on_value=session.set_profiling)
+    solara.Markdown(status)
 
 @solara.component
-def MainPage(model):
+def MainPage(session, version):
     solara.Markdown("#Simulacija")
+    Controls(session, version)
 
     with solara.Column(gap="20px"):
-        with solara.Row(gap="20px"):
-            with solara.Column(style={"width": "50%"}):
-                GroundFloorPage(model)
-            with solara.Column(style={"width": "50%"}):
-                FirstFloorPage(model)
+        # po dva kata u redu, koliko ih raspored ima
+        floors = sorted(session.model.grids)
+        for i in range(0, len(floors), 2):
+            with solara.Row(gap="20px"):
+                for floor_id in floors[i:i + 2]:
+                    with solara.Column(style={"width": "50%"}):
+                        FloorPage(session, version, floor_id, floor_title(floor_id))
 
         with solara.Row(gap="20px"):
             with solara.Column(style={"width": "50%"}):
-                ExitFlowPlot(model)
+                ExitFlowPlot(session, version)
 
             with solara.Column(style={"width": "50%"}):
-                EvacuationProgressPlot(model)
+                EvacuationProgressPlot(session, version)
+
+        ProfilerTable(session, version)
+
+# svaka sesija preglednika dobiva svoj model i svoju dretvu; version samo okida ponovno crtanje
+@solara.component
+def Page():
+    session = solara.use_memo(SimulationSession, [])
+    version, set_version = solara.use_state(session.version)
+
+    def connect():
+        unsubscribe = session.subscribe(set_version)
+
+        def cleanup():
+            unsubscribe()
+            session.close()
+
+        return cleanup
+
+    solara.use_effect(connect, [session])
+    solara.use_effect(session.rendered, [version])
+
+    solara.Title("Simulacija evakuacije zgrade")
+    MainPage(session, version)
 
 
-server = SolaraViz(
-    model,
-    components = [MainPage],
-    name="Simulacija evakuacije zgrade",
-    use_threads=False
-)
+server = Page
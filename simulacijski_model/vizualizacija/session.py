@@ -0,0 +1,165 @@
+import threading
+import time
+
+from model.model import EvaluationModel
+from model.events import EventLog
+
+DEFAULT_LAYOUT = "podaci/building_layout.json"
+
+# zadano: 10 koraka u sekundi po 1 korak, sučelje se obavještava najviše 10 puta u sekundi
+TARGET_RATE = 10.0
+BATCH_STEPS = 1
+PUBLISH_MAX_PER_SECOND = 10.0
+# objava bez potvrde crtanja ipak ide nakon ovoliko sekundi
+PUBLISH_ACK_TIMEOUT_S = 1.0
+
+
+def make_model(layout=DEFAULT_LAYOUT, seed=None):
+    return EvaluationModel(layout, seed=seed, event_log=EventLog(echo=True))
+
+
+class SimulationSession:
+    """Model jedne sesije preglednika i pozadinska dretva koja ga pomiče"""
+
+    def __init__(self, factory=make_model, rate=TARGET_RATE, batch=BATCH_STEPS,
+                 publish_per_second=PUBLISH_MAX_PER_SECOND, **options):
+        self.factory = factory
+        self.rate = rate
+        self.batch = batch
+        self.min_publish_interval = 1.0 / publish_per_second if publish_per_second else 0.0
+
+        # dretva drži lock dok radi paket koraka, crtanje ga drži dok čita model
+        self.lock = threading.RLock()
+        self.listeners = []
+        self.version = 0
+
+        # slušatelje zove zasebna dretva, pa pomicanje modela nikad ne čeka na crtanje;
+        # nova objava ide tek kad sučelje nacrta prethodnu, objave se ne gomilaju iza sporog crtanja
+        self._changed = threading.Event()
+        self._drawn = threading.Event()
+        self._drawn.set()
+        self._closed = False
+        self._notifier = threading.Thread(target=self._notify_loop, daemon=True)
+        self._notifier.start()
+
+        self._stop = threading.Event()
+        self._stop.set()
+        self._thread = None
+
+        # profiler je isključen dok ga korisnik ne uključi, ostaje uključen i nakon reset()
+        self.profiling = False
+        self.model = factory(**options)
+
+    @property
+    def playing(self):
+        return not self._stop.is_set()
+
+    def subscribe(self, listener):
+        self.listeners.append(listener)
+
+        def unsubscribe():
+            if listener in self.listeners:
+                self.listeners.remove(listener)
+
+        return unsubscribe
+
+    # sučelje potvrđuje da je nacrtalo zadnju objavu
+    def rendered(self):
+        self._drawn.set()
+
+    # objava samo označi novo stanje, slušatelji dobiju zadnju verziju kad na njih dođe red
+    def _publish(self):
+        self.version += 1
+        self._changed.set()
+
+    def _notify_loop(self):
+        while True:
+            self._changed.wait()
+            if self._closed:
+                return
+            self._changed.clear()
+
+            started = time.perf_counter()
+            self._drawn.clear()
+            for listener in list(self.listeners):
+                listener(self.version)
+
+            self._drawn.wait(PUBLISH_ACK_TIMEOUT_S)
+            delay = self.min_publish_interval - (time.perf_counter() - started)
+            if delay > 0:
+                time.sleep(delay)
+
+    def _run(self, stop):
+        next_time = time.perf_counter()
+
+        while not stop.is_set():
+            with self.lock:
+                model = self.model
+                for _ in range(max(1, int(self.batch))):
+                    if not model.running:
+                        break
+                    model.step()
+                finished = not model.running
+
+            if finished:
+                stop.set()
+                self._publish()
+                return
+            self._publish()
+
+            if self.rate:
+                next_time += max(1, int(self.batch)) / self.rate
+                delay = next_time - time.perf_counter()
+                if delay > 0:
+                    stop.wait(delay)
+                else:
+                    # zaostatak se ne sustiže naletom koraka
+                    next_time = time.perf_counter()
+            else:
+                time.sleep(0)
+
+    def start(self):
+        if self.playing or not self.model.running:
+            return
+
+        # stara dretva ima svoj događaj i završava nakon trenutnog paketa
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(self._stop,), daemon=True)
+        self._thread.start()
+        self._publish()
+
+    def pause(self):
+        if not self.playing:
+            return
+        self._stop.set()
+        self._publish()
+
+    def step_once(self):
+        with self.lock:
+            if self.model.running:
+                self.model.step()
+        self._publish()
+
+    # u sučelju se čuvaju samo zbrojevi faza, ne red po koraku
+    def set_profiling(self, enabled):
+        self.profiling = enabled
+        with self.lock:
+            self.model.set_profiling(enabled, keep_rows=False)
+        self._publish()
+
+    def reset(self, **options):
+        self.pause()
+        with self.lock:
+            old = self.model
+            self.model = self.factory(**options)
+            self.model.set_profiling(self.profiling, keep_rows=False)
+            old.events.close()
+        self._publish()
+
+    def close(self):
+        self._stop.set()
+        self._closed = True
+        self._changed.set()
+        self.listeners.clear()
+        with self.lock:
+            self.model.events.close()